@@ -0,0 +1,122 @@
+import copy
+from collections import Counter
+
+
+def split_genres(genre):
+    """
+    Split a book's genre field into individual genres, ignoring 'Unknown'.
+    """
+    if not genre or genre == 'Unknown':
+        return []
+    # Handle multiple genres separated by commas
+    return str(genre).split(', ')
+
+
+def _bump(counter, key, delta):
+    # Drop keys that fall to zero so removed values disappear from facets
+    value = counter.get(key, 0) + delta
+    if value:
+        counter[key] = value
+    else:
+        counter.pop(key, None)
+
+
+def _as_number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class LibraryFacets:
+    """
+    Counts and sums over a library, computed in a single pass and kept up
+    to date with add/remove deltas as books change.
+
+    Attributes:
+        total (int): Number of books
+        status (Counter): Books per reading status ('Unknown' if missing)
+        genre (Counter): Books per genre, comma-separated genres split
+        year (Counter): Books per publication year, as strings
+        author (Counter): Books per author ('Unknown' if missing)
+        rating (Counter): Books per rating, for rated (> 0) books
+        pages (Counter): Page totals per status, for books with pages > 0
+        paged_books (Counter): Books with pages > 0 per status
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.status = Counter()
+        self.genre = Counter()
+        self.year = Counter()
+        self.author = Counter()
+        self.rating = Counter()
+        self.pages = Counter()
+        self.paged_books = Counter()
+
+    def add(self, book, sign=1):
+        """
+        Count one book into every facet.
+
+        Args:
+            book (dict): Book to count
+            sign (int): 1 to add the book, -1 to take it back out
+        """
+        self.total += sign
+        status = book.get('status', 'Unknown')
+        _bump(self.status, status, sign)
+        for genre in split_genres(book.get('genre', 'Unknown')):
+            _bump(self.genre, genre, sign)
+
+        year = book.get('year', 'Unknown')
+        if year and year != 'Unknown':
+            # Convert to string in case it's a number
+            _bump(self.year, str(year), sign)
+
+        _bump(self.author, book.get('author', 'Unknown'), sign)
+
+        rating = _as_number(book.get('rating'))
+        if rating > 0:
+            _bump(self.rating, int(rating) if rating.is_integer() else rating, sign)
+
+        pages = _as_number(book.get('pages'))
+        if pages > 0:
+            _bump(self.pages, status, sign * pages)
+            _bump(self.paged_books, status, sign)
+
+    def remove(self, book):
+        """Take a previously counted book back out of every facet."""
+        self.add(book, sign=-1)
+
+    def copy(self):
+        """Return an independent copy, safe to read while this one changes."""
+        return copy.deepcopy(self)
+
+    @property
+    def read_percentage(self):
+        """Share of the library with status 'Read', as a percentage."""
+        return (self.status.get('Read', 0) / self.total * 100) if self.total > 0 else 0
+
+    @property
+    def average_rating(self):
+        """Mean rating over rated books (0 if none are rated)."""
+        rated = sum(self.rating.values())
+        if not rated:
+            return 0
+        return sum(rating * count for rating, count in self.rating.items()) / rated
+
+
+def compute_facets(books):
+    """
+    Compute every facet of a list of books in one pass.
+
+    Args:
+        books (iterable): Book dictionaries
+
+    Returns:
+        LibraryFacets: Counts and sums for the books
+    """
+    facets = LibraryFacets()
+    for book in books:
+        facets.add(book)
+    return facets
@@ -1,100 +1,427 @@
+import hashlib
 import json
+import os
 import random
+import threading
 import streamlit as st
 from openai import OpenAI
 from helpers.book_data import load_books
+from helpers.aggregations import compute_facets
+from helpers.response_cache import ResponseCache
+from helpers.local_recommender import recommend_locally
+
+def get_openai_setting(name, default=None):
+    """
+    Read an OpenAI setting from secrets, then the environment.
+    """
+    try:
+        value = st.secrets["OPENAI"].get(name)
+    except Exception:
+        value = None
+    return value or os.environ.get(name, default)
 
 # Correctly getting API key from Streamlit secrets
-OPENAI_API_KEY = st.secrets["OPENAI"]["OPENAI_API_KEY"]
-openai = OpenAI(api_key=OPENAI_API_KEY)
+OPENAI_API_KEY = get_openai_setting("OPENAI_API_KEY")
+# OPENAI_BASE_URL points the client at another endpoint, e.g. the local
+# fake in tests/fakes.py; without a key no request is made
+openai = OpenAI(api_key=OPENAI_API_KEY or "unset", base_url=get_openai_setting("OPENAI_BASE_URL"))
 
-def get_book_recommendations(user_books, recommendation_type="similar"):
+# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+# do not change this unless explicitly requested by the user
+OPENAI_MODEL = "gpt-4o"
+
+# Seconds a recommendation is reused for an unchanged library slice
+RECOMMENDATION_TTL = {
+    'similar': 7 * 24 * 60 * 60,
+    'genre': 7 * 24 * 60 * 60,
+    'surprise': 24 * 60 * 60
+}
+# On-disk tier of the cache (override with RECOMMENDATION_CACHE_PATH)
+DEFAULT_CACHE_PATH = os.path.join('data', 'cache', 'recommendations.sqlite')
+
+_recommendation_cache = None
+_recommendation_cache_lock = threading.Lock()
+
+def recommendation_inputs(user_books, recommendation_type="similar"):
     """
-    Get AI-powered book recommendations based on user's library
+    Extract the slice of a library that the recommendation prompt uses.
+
+    Args:
+        user_books (list): List of user's books
+        recommendation_type (str): Type of recommendation ('similar', 'genre', 'surprise')
+
+    Returns:
+        dict: Titles, authors and (for 'genre') top genres in the prompt
+    """
+    user_authors = [book.get('author', 'Unknown') for book in user_books if book.get('author')]
+    user_titles = [book.get('title', 'Unknown') for book in user_books if book.get('title')]
     
+    if recommendation_type == "similar":
+        return {'titles': user_titles[:5], 'authors': user_authors[:5]}
+    elif recommendation_type == "genre":
+        # Get most common genres
+        top_genres = compute_facets(user_books).genre.most_common(3)
+        return {'genres': [g[0] for g in top_genres], 'titles': user_titles[:10]}
+    else:  # surprise
+        return {'titles': user_titles[:5]}
+
+def build_prompt(inputs, recommendation_type="similar"):
+    """
+    Build the recommendation prompt from recommendation_inputs.
+    """
+    if recommendation_type == "similar":
+        return (
+            f"Based on these books in my library: {', '.join(inputs['titles'])}, "
+            f"by authors: {', '.join(inputs['authors'])}, "
+            f"recommend 5 similar books I might enjoy. "
+            f"Format the response as a JSON array with objects containing 'title', 'author', and 'reason' fields."
+        )
+    elif recommendation_type == "genre":
+        return (
+            f"Based on my preference for these genres: {', '.join(inputs['genres'])}, "
+            f"recommend 5 highly regarded books in these genres that aren't already in my library: {', '.join(inputs['titles'])}. "
+            f"Format the response as a JSON array with objects containing 'title', 'author', 'genre', and 'reason' fields."
+        )
+    else:  # surprise
+        return (
+            "Recommend 5 surprising and unique books that might expand my reading horizons. "
+            "They should be different from what I usually read but still engaging. "
+            f"My current library includes: {', '.join(inputs['titles'])}. "
+            f"Format the response as a JSON array with objects containing 'title', 'author', 'genre', and 'reason' fields."
+        )
+
+def library_fingerprint(user_books, recommendation_type="similar", model=OPENAI_MODEL):
+    """
+    Stable hash of everything a recommendation depends on: the prompt's
+    slice of the library, the recommendation type and the model.
+
+    Books outside the slice (or fields the prompt ignores) do not change it.
+    """
+    payload = {
+        'type': recommendation_type,
+        'model': model,
+        'inputs': recommendation_inputs(user_books, recommendation_type)
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def recommendation_key(user_books, recommendation_type="similar"):
+    """
+    Cache key of a library's recommendations of one type.
+    """
+    return f"{recommendation_type}:{library_fingerprint(user_books, recommendation_type)}"
+
+def recommendation_ttl(recommendation_type="similar"):
+    """
+    Seconds a cached recommendation of this type stays fresh.
+    """
+    return RECOMMENDATION_TTL.get(recommendation_type, RECOMMENDATION_TTL['similar'])
+
+class IncompleteReplyError(ValueError):
+    """Raised when the model stopped before finishing its reply."""
+
+    def __init__(self, finish_reason):
+        super().__init__(f"Reply ended early (finish_reason={finish_reason})")
+        self.finish_reason = finish_reason
+
+
+def parse_recommendations(recommendations_text):
+    """
+    Parse the model's JSON reply into a list of recommendations.
+
+    Raises:
+        ValueError: If the reply is not JSON or not in the expected shape
+    """
+    recommendations = json.loads(recommendations_text)
+    
+    # Check if the response is in the expected format
+    if isinstance(recommendations, dict) and 'recommendations' in recommendations:
+        return recommendations['recommendations']
+    elif isinstance(recommendations, list):
+        return recommendations
+    raise ValueError("Unexpected recommendation format")
+
+def request_recommendations(user_books, recommendation_type="similar"):
+    """
+    Ask the model for recommendations, bypassing the cache.
+
+    Raises:
+        Exception: On API errors or unparseable replies
+    """
+    prompt = build_prompt(recommendation_inputs(user_books, recommendation_type), recommendation_type)
+    
+    # Call OpenAI API
+    response = openai.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a literary expert providing book recommendations."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=800
+    )
+    
+    # A reply cut off at max_tokens is not a complete answer
+    if response.choices[0].finish_reason != "stop":
+        raise IncompleteReplyError(response.choices[0].finish_reason)
+    
+    # Parse response
+    return parse_recommendations(response.choices[0].message.content)
+
+def get_recommendation_cache():
+    """
+    Return the process-wide recommendation cache (memory + SQLite file).
+    """
+    global _recommendation_cache
+    if _recommendation_cache is None:
+        with _recommendation_cache_lock:
+            if _recommendation_cache is None:
+                _recommendation_cache = ResponseCache(
+                    os.environ.get('RECOMMENDATION_CACHE_PATH', DEFAULT_CACHE_PATH),
+                    memory_entries=256,
+                    disk_entries=5000
+                )
+    return _recommendation_cache
+
+def recommend(user_books, recommendation_type="similar"):
+    """
+    Get recommendations, served from the cache when the library slice,
+    type and model match an earlier request.
+
     Args:
         user_books (list): List of user's books
         recommendation_type (str): Type of recommendation ('similar', 'genre', 'surprise')
-        
+
     Returns:
-        list: List of recommended books
+        tuple: (list of recommended books, True if served from the cache)
     """
     if not user_books:
-        return []
+        return [], False
     
     # Check if OpenAI API key is available
     if not OPENAI_API_KEY:
         # Fallback to simple recommendation if no API key
-        return get_simple_recommendations(user_books, recommendation_type)
+        return get_simple_recommendations(user_books, recommendation_type), False
+    
+    fetched = []
+    def fetch():
+        fetched.append(True)
+        return request_recommendations(user_books, recommendation_type)
     
     try:
-        # Prepare data for OpenAI prompt
-        # Extract relevant information about user's library
-        user_genres = [book.get('genre', 'Unknown') for book in user_books if book.get('genre')]
-        user_authors = [book.get('author', 'Unknown') for book in user_books if book.get('author')]
-        user_titles = [book.get('title', 'Unknown') for book in user_books if book.get('title')]
-        
-        # Create a prompt based on recommendation type
-        if recommendation_type == "similar":
-            prompt = (
-                f"Based on these books in my library: {', '.join(user_titles[:5])}, "
-                f"by authors: {', '.join(user_authors[:5])}, "
-                f"recommend 5 similar books I might enjoy. "
-                f"Format the response as a JSON array with objects containing 'title', 'author', and 'reason' fields."
-            )
-        elif recommendation_type == "genre":
-            # Get most common genres
-            genre_counts = {}
-            for genre in user_genres:
-                if genre and genre != 'Unknown':
-                    for g in genre.split(', '):
-                        genre_counts[g] = genre_counts.get(g, 0) + 1
-            
-            top_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:3]
-            top_genre_names = [g[0] for g in top_genres]
-            
-            prompt = (
-                f"Based on my preference for these genres: {', '.join(top_genre_names)}, "
-                f"recommend 5 highly regarded books in these genres that aren't already in my library: {', '.join(user_titles[:10])}. "
-                f"Format the response as a JSON array with objects containing 'title', 'author', 'genre', and 'reason' fields."
-            )
-        else:  # surprise
-            prompt = (
-                "Recommend 5 surprising and unique books that might expand my reading horizons. "
-                "They should be different from what I usually read but still engaging. "
-                f"My current library includes: {', '.join(user_titles[:5])}. "
-                f"Format the response as a JSON array with objects containing 'title', 'author', 'genre', and 'reason' fields."
-            )
-        
-        # Call OpenAI API
-        # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-        # do not change this unless explicitly requested by the user
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a literary expert providing book recommendations."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            max_tokens=800
+        recommendations = get_recommendation_cache().get_or_fetch(
+            recommendation_key(user_books, recommendation_type),
+            fetch,
+            recommendation_ttl(recommendation_type)
         )
-        
-        # Parse response
-        recommendations_text = response.choices[0].message.content
-        recommendations = json.loads(recommendations_text)
-        
-        # Check if the response is in the expected format
-        if isinstance(recommendations, dict) and 'recommendations' in recommendations:
-            return recommendations['recommendations']
-        elif isinstance(recommendations, list):
-            return recommendations
-        else:
-            return get_simple_recommendations(user_books, recommendation_type)
-            
+        return recommendations, not fetched
     except Exception as e:
         print(f"Error getting AI recommendations: {str(e)}")
-        # Fallback to simple recommendation
-        return get_simple_recommendations(user_books, recommendation_type)
+        # Fallback to simple recommendation (never cached)
+        return get_simple_recommendations(user_books, recommendation_type), False
+
+class RecommendationStreamParser:
+    """
+    Incrementally pick complete recommendation objects out of a streamed
+    JSON reply, e.g. {"recommendations": [{...}, {...`, before the reply
+    is finished.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self._pos = 0
+        self._starts = []  # positions of the '{' of the objects still open
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk):
+        """
+        Add streamed text and return the recommendations it completed.
+
+        Returns:
+            list: Newly completed objects with a 'title'
+        """
+        self.text += chunk
+        completed = []
+        for i in range(self._pos, len(self.text)):
+            char = self.text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._starts.append(i)
+            elif char == '}' and self._starts:
+                start = self._starts.pop()
+                try:
+                    item = json.loads(self.text[start:i + 1])
+                except ValueError:
+                    continue
+                # The wrapping {"recommendations": ...} object has no title
+                if isinstance(item, dict) and 'title' in item:
+                    completed.append(item)
+        self._pos = len(self.text)
+        return completed
+
+
+def stream_recommendations(user_books, recommendation_type="similar"):
+    """
+    Ask the model for recommendations and yield each one as soon as its
+    JSON object has streamed in, bypassing the cache.
+
+    Yields:
+        dict: Each recommendation
+
+    Raises:
+        IncompleteReplyError: After the last recommendation, if the reply
+            did not finish normally (e.g. it hit max_tokens)
+        Exception: On API errors
+    """
+    prompt = build_prompt(recommendation_inputs(user_books, recommendation_type), recommendation_type)
+    stream = openai.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a literary expert providing book recommendations."},
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=800,
+        stream=True
+    )
+    parser = RecommendationStreamParser()
+    finish_reason = None
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield from parser.feed(delta)
+        finish_reason = chunk.choices[0].finish_reason or finish_reason
+    if finish_reason != "stop":
+        raise IncompleteReplyError(finish_reason)
+
+
+class RecommendationJob:
+    """
+    Recommendation request running in a background thread.
+
+    The Streamlit script starts a job, keeps the handle in session state
+    and polls it on later reruns: `recommendations` grows as results are
+    parsed from the streamed reply, and `done` is set once it is complete.
+
+    Attributes:
+        recommendation_type (str): 'similar', 'genre' or 'surprise'
+        recommendations (list): Recommendations received so far
+        from_cache (bool): Served from the recommendation cache
+        fallback (bool): The AI request failed; these are simple recommendations
+        error (str or None): Why the AI request failed
+        done (bool): No more recommendations will arrive
+    """
+
+    def __init__(self, user_books, recommendation_type="similar"):
+        self.recommendation_type = recommendation_type
+        self.recommendations = []
+        self.from_cache = False
+        self.fallback = False
+        self.error = None
+        self.done = False
+        self._user_books = list(user_books)
+        self._thread = None
+
+    def start(self):
+        """Answer from the cache, or start the request in a daemon thread."""
+        if not self._user_books or not OPENAI_API_KEY:
+            self._finish_with_fallback(None)
+            return self
+        if self.load_cached():
+            return self
+        self._thread = threading.Thread(target=self._run, name="recommendations", daemon=True)
+        self._thread.start()
+        return self
+
+    def load_cached(self):
+        """
+        Take a fresh cached (or precomputed) answer if there is one.
+
+        Returns:
+            bool: True if the job is now done with cached recommendations
+        """
+        self._key = recommendation_key(self._user_books, self.recommendation_type)
+        cached = get_recommendation_cache().get(self._key, recommendation_ttl(self.recommendation_type))
+        if cached is None:
+            return False
+        self.recommendations = cached
+        self.from_cache = True
+        self.done = True
+        return True
+
+    def _fetch(self):
+        for recommendation in stream_recommendations(self._user_books, self.recommendation_type):
+            # Replace rather than append so readers never see a list mid-update
+            self.recommendations = self.recommendations + [recommendation]
+        if not self.recommendations:
+            raise ValueError("No recommendations in the reply")
+        return self.recommendations
+
+    def _run(self):
+        try:
+            # Only a complete reply is cached; identical jobs running at the
+            # same time wait for this one's request instead of sending their own
+            self.recommendations = get_recommendation_cache().get_or_fetch(
+                self._key, self._fetch, recommendation_ttl(self.recommendation_type)
+            )
+            self.done = True
+        except Exception as e:
+            print(f"Error getting AI recommendations: {str(e)}")
+            self._finish_with_fallback(str(e))
+
+    def _finish_with_fallback(self, error):
+        self.error = error
+        if not self.recommendations:
+            self.recommendations = get_simple_recommendations(self._user_books, self.recommendation_type) if self._user_books else []
+            self.fallback = bool(self._user_books)
+        self.done = True
+
+
+def start_recommendation_job(user_books, recommendation_type="similar"):
+    """
+    Start generating recommendations without blocking the caller.
+
+    Returns:
+        RecommendationJob: Handle to poll for results
+    """
+    return RecommendationJob(user_books, recommendation_type).start()
+
+def cached_recommendation_job(user_books, recommendation_type="similar"):
+    """
+    A finished job holding the fresh cached (or precomputed) recommendations
+    for a library, without requesting new ones.
+
+    Returns:
+        RecommendationJob or None: None if nothing fresh is cached
+    """
+    job = RecommendationJob(user_books, recommendation_type)
+    if not user_books or not job.load_cached():
+        return None
+    return job
+
+def get_book_recommendations(user_books, recommendation_type="similar"):
+    """
+    Get AI-powered book recommendations based on user's library
+    
+    Args:
+        user_books (list): List of user's books
+        recommendation_type (str): Type of recommendation ('similar', 'genre', 'surprise')
+        
+    Returns:
+        list: List of recommended books
+    """
+    return recommend(user_books, recommendation_type)[0]
 
 def get_simple_recommendations(user_books, recommendation_type="similar"):
     """
@@ -107,6 +434,12 @@ def get_simple_recommendations(user_books, recommendation_type="similar"):
     Returns:
         list: List of recommended books
     """
+    # Content-based picks from the local catalog (sample books plus cached
+    # Open Library results)
+    local_recommendations = recommend_locally(user_books, recommendation_type)
+    if local_recommendations:
+        return local_recommendations
+    
     # Sample classic book recommendations as fallback
     classic_recommendations = [
         {
@@ -0,0 +1,351 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+# Random-projection LSH defaults: more tables raise recall, more bits per
+# table shrink buckets (and so latency). Chosen with benchmark() below:
+# ~0.95 recall@10 at a seventh of the exact scan's latency on 100k vectors
+DEFAULT_TABLES = 16
+DEFAULT_BITS = 12
+# Extra buckets probed per table, flipping the least certain bits
+DEFAULT_PROBES = 6
+# Rows added per chunk, bounding the projection's temporary memory
+ADD_CHUNK_ROWS = 10000
+# Adds of at least this many rows regroup all buckets instead of appending
+REBUILD_ROWS = 1000
+
+
+class ExactIndex:
+    """
+    Brute-force cosine search over unit vectors: one matrix-vector product
+    per query. The reference the approximate index is measured against.
+
+    Vectors live in a buffer that doubles when full, so adding a few rows
+    does not copy the whole index.
+
+    Attributes:
+        vectors (numpy.ndarray): Buffer whose first len(self) rows are the
+            added vectors
+        ids (list): Caller-supplied id of each row
+    """
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, vectors, ids):
+        """Append unit vectors with their ids; returns their row numbers."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        start = len(self.ids)
+        if start + len(vectors) > len(self.vectors):
+            grown = np.zeros((max(start + len(vectors), 2 * len(self.vectors), 1024), self.dimensions),
+                             dtype=np.float32)
+            grown[:start] = self.vectors[:start]
+            self.vectors = grown
+        self.vectors[start:start + len(vectors)] = vectors
+        self.ids.extend(ids)
+        return list(range(start, len(self.ids)))
+
+    def search(self, vector, k, exclude=()):
+        """
+        Find the k rows most similar to a unit vector.
+
+        Args:
+            vector (numpy.ndarray): Query vector
+            k (int): Number of results
+            exclude (iterable): Row numbers to skip
+
+        Returns:
+            list: (row, score) pairs, best first
+        """
+        return _top_k(np.arange(len(self.ids)), self.vectors[:len(self.ids)] @ vector, k, exclude)
+
+
+class LSHIndex:
+    """
+    Approximate cosine search with random-projection LSH.
+
+    Each of `tables` hash tables signs the vector's projections onto `bits`
+    random hyperplanes; vectors with a small angle between them tend to
+    share a bucket. A query gathers the rows in its bucket (and `probes`
+    neighbouring buckets) of every table and ranks only those exactly.
+
+    With a path, vectors, hash codes and ids live in files next to it and
+    the vectors are memory-mapped, so a large catalog is neither rebuilt
+    nor fully loaded at start-up. add() appends in place.
+
+    Attributes:
+        vectors (numpy.ndarray or numpy.memmap): One row per added vector
+        ids (list): Caller-supplied id of each row
+    """
+
+    def __init__(self, dimensions, tables=DEFAULT_TABLES, bits=DEFAULT_BITS,
+                 probes=DEFAULT_PROBES, seed=0, path=None):
+        self.dimensions = dimensions
+        self.tables = tables
+        self.bits = bits
+        self.probes = probes
+        self.seed = seed
+        self.path = path
+        self.ids = []
+        self._count = 0
+        self._capacity = 0
+        self.vectors = np.zeros((0, dimensions), dtype=np.float32)
+        self._codes = np.zeros((0, tables), dtype=np.uint64)
+        self._planes = np.random.default_rng(seed).standard_normal((tables * bits, dimensions)).astype(np.float32)
+        self._weights = (np.uint64(1) << np.arange(bits, dtype=np.uint64))
+        self._buckets = [{} for _ in range(tables)]  # per table: code -> row array
+        if path and os.path.exists(self._file('meta.json')):
+            self._load()
+
+    def __len__(self):
+        return self._count
+
+    # Persistence
+
+    def _file(self, suffix):
+        return f"{self.path}.{suffix}"
+
+    def _load(self):
+        with open(self._file('meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        expected = {'dimensions': self.dimensions, 'tables': self.tables, 'bits': self.bits, 'seed': self.seed}
+        if {key: meta.get(key) for key in expected} != expected:
+            raise ValueError(f"Index at {self.path} was built with different parameters: {meta}")
+        self._count = meta['count']
+        self._capacity = meta['capacity']
+        self._map_files()
+        with open(self._file('ids'), 'r', encoding='utf-8') as f:
+            self.ids = [line.rstrip('\n') for line in f][:self._count]
+        self._rebuild_buckets()
+
+    def _map_files(self):
+        self.vectors = np.memmap(self._file('vectors'), dtype=np.float32, mode='r+',
+                                 shape=(self._capacity, self.dimensions))
+        self._codes = np.memmap(self._file('codes'), dtype=np.uint64, mode='r+',
+                                shape=(self._capacity, self.tables))
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * self._capacity, 1024)
+        if self.path is None:
+            vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+            codes = np.zeros((capacity, self.tables), dtype=np.uint64)
+            vectors[:self._count] = self.vectors[:self._count]
+            codes[:self._count] = self._codes[:self._count]
+            self.vectors, self._codes = vectors, codes
+        else:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            for suffix, row_bytes in (('vectors', 4 * self.dimensions), ('codes', 8 * self.tables)):
+                # Extending the file keeps the rows already written
+                with open(self._file(suffix), 'ab') as f:
+                    f.truncate(capacity * row_bytes)
+            self.vectors = self._codes = None
+            self._capacity = capacity
+            self._map_files()
+        self._capacity = capacity
+
+    def _save_meta(self):
+        if self.path is None:
+            return
+        self.vectors.flush()
+        self._codes.flush()
+        meta = {'dimensions': self.dimensions, 'tables': self.tables, 'bits': self.bits,
+                'seed': self.seed, 'count': self._count, 'capacity': self._capacity}
+        # Written last: rows beyond the recorded count are ignored on load
+        with open(self._file('meta.json.tmp'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(self._file('meta.json.tmp'), self._file('meta.json'))
+
+    def save_array(self, name, array):
+        """Store an auxiliary array (e.g. model weights) next to the index."""
+        if self.path is not None:
+            np.save(self._file(f'{name}.npy'), array)
+
+    def load_array(self, name):
+        """Load an array stored with save_array, or None."""
+        if self.path is None or not os.path.exists(self._file(f'{name}.npy')):
+            return None
+        return np.load(self._file(f'{name}.npy'))
+
+    # Hashing
+
+    def _projections(self, vectors):
+        return (np.asarray(vectors, dtype=np.float32) @ self._planes.T).reshape(-1, self.tables, self.bits)
+
+    def _hash(self, projections):
+        return ((projections > 0).astype(np.uint64) * self._weights).sum(axis=-1, dtype=np.uint64)
+
+    def _rebuild_buckets(self):
+        self._buckets = []
+        rows = np.arange(self._count)
+        for table in range(self.tables):
+            codes = np.asarray(self._codes[:self._count, table])
+            order = np.argsort(codes, kind='stable')
+            unique, starts = np.unique(codes[order], return_index=True)
+            self._buckets.append(dict(zip(unique.tolist(), np.split(rows[order], starts[1:]))))
+
+    # Maintenance
+
+    def add(self, vectors, ids):
+        """
+        Append unit vectors with their ids and index them.
+
+        Returns:
+            list: Row numbers of the added vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        start = self._count
+        if start + len(vectors) > self._capacity:
+            self._grow(start + len(vectors))
+        for offset in range(0, len(vectors), ADD_CHUNK_ROWS):
+            chunk = vectors[offset:offset + ADD_CHUNK_ROWS]
+            first = start + offset
+            codes = self._hash(self._projections(chunk))
+            self.vectors[first:first + len(chunk)] = chunk
+            self._codes[first:first + len(chunk)] = codes
+        self._count += len(vectors)
+        if len(vectors) >= REBUILD_ROWS:
+            # Regrouping every row is cheaper than appending to buckets one by one
+            self._rebuild_buckets()
+        else:
+            for row, row_codes in enumerate(self._codes[start:self._count].tolist(), start):
+                for table, code in enumerate(row_codes):
+                    bucket = self._buckets[table].get(code)
+                    self._buckets[table][code] = np.array([row]) if bucket is None else np.append(bucket, row)
+        ids = [str(row_id).replace('\n', ' ') for row_id in ids]
+        self.ids.extend(ids)
+        if self.path is not None:
+            with open(self._file('ids'), 'a', encoding='utf-8') as f:
+                f.writelines(f"{row_id}\n" for row_id in ids)
+        self._save_meta()
+        return list(range(start, self._count))
+
+    # Queries
+
+    def candidates(self, vector):
+        """Rows sharing a probed bucket with the vector in any table."""
+        projections = self._projections(vector[np.newaxis, :])[0]
+        codes = self._hash(projections)
+        found = []
+        for table in range(self.tables):
+            buckets = self._buckets[table]
+            probe_codes = [int(codes[table])]
+            # The bits whose hyperplane the query is closest to are the
+            # likeliest to differ for a near neighbour
+            for bit in np.argsort(np.abs(projections[table]))[:self.probes]:
+                probe_codes.append(int(codes[table]) ^ (1 << int(bit)))
+            for code in probe_codes:
+                bucket = buckets.get(code)
+                if bucket is not None:
+                    found.append(bucket)
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def search(self, vector, k, exclude=()):
+        """
+        Find (approximately) the k rows most similar to a unit vector.
+
+        Candidates from the hash tables are ranked exactly; if fewer than
+        k of them are left after exclusions the whole index is scanned.
+
+        Args:
+            vector (numpy.ndarray): Query vector
+            k (int): Number of results
+            exclude (iterable): Row numbers to skip
+
+        Returns:
+            list: (row, score) pairs, best first
+        """
+        exclude = np.fromiter(set(exclude), dtype=np.int64)
+        rows = self.candidates(vector)
+        if len(exclude):
+            # Only excluded rows among the candidates shrink the pool
+            rows = rows[~np.isin(rows, exclude)]
+        if len(rows) < k:
+            rows = np.arange(self._count)
+            return _top_k(rows, self.vectors[rows] @ vector, k, exclude.tolist())
+        return _top_k(rows, self.vectors[rows] @ vector, k)
+
+
+def _top_k(rows, scores, k, exclude=()):
+    """
+    Best k (row, score) pairs of parallel row/score arrays, skipping excluded rows.
+    """
+    if not len(rows) or k <= 0:
+        return []
+    scores = np.array(scores, dtype=np.float32)
+    if exclude:
+        scores[np.isin(rows, list(exclude))] = -np.inf
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(int(rows[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+def benchmark(size=100000, dimensions=256, queries=200, k=10, clusters=1000, configs=None, seed=0):
+    """
+    Measure recall and latency of LSH settings against exact search.
+
+    Vectors are drawn around a two-level hierarchy of random centres (like
+    books grouped by genre, then author); queries are perturbed catalog
+    vectors.
+
+    Returns:
+        list: One dict per setting with tables, bits, probes, recall@k,
+            mean query milliseconds and mean candidates per query
+    """
+    rng = np.random.default_rng(seed)
+    def unit(matrix):
+        return (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).astype(np.float32)
+    # Genres -> authors/series within them -> books, so similarity is graded
+    centres = unit(rng.standard_normal((clusters, dimensions)))
+    groups = unit(centres[rng.integers(clusters, size=clusters * 10)] + 0.7 * unit(rng.standard_normal((clusters * 10, dimensions))))
+    vectors = unit(groups[rng.integers(len(groups), size=size)] + 0.5 * unit(rng.standard_normal((size, dimensions))))
+    query_vectors = unit(vectors[rng.integers(size, size=queries)] + 0.3 * unit(rng.standard_normal((queries, dimensions))))
+    ids = [str(i) for i in range(size)]
+
+    exact = ExactIndex(dimensions)
+    exact.add(vectors, ids)
+    start = time.perf_counter()
+    truth = [{row for row, _ in exact.search(q, k)} for q in query_vectors]
+    results = [{'index': 'exact', 'recall': 1.0,
+                'ms': (time.perf_counter() - start) / queries * 1000, 'candidates': size}]
+
+    for tables, bits, probes in configs or [(8, 10, 4), (16, 10, 4), (16, 12, 6), (24, 12, 6), (32, 14, 8)]:
+        index = LSHIndex(dimensions, tables=tables, bits=bits, probes=probes, seed=seed)
+        index.add(vectors, ids)
+        found = 0
+        candidates = 0
+        start = time.perf_counter()
+        for q, expected in zip(query_vectors, truth):
+            found += len(expected & {row for row, _ in index.search(q, k)})
+        elapsed = time.perf_counter() - start
+        for q in query_vectors[:20]:
+            candidates += len(index.candidates(q))
+        results.append({'index': f'lsh tables={tables} bits={bits} probes={probes}',
+                        'recall': found / (k * queries), 'ms': elapsed / queries * 1000,
+                        'candidates': candidates // 20})
+    return results
+
+
+if __name__ == '__main__':
+    # e.g. python -m helpers.ann_index --size 1000000 --dimensions 256
+    parser = argparse.ArgumentParser(description="Recall vs. latency of the LSH index against exact search")
+    parser.add_argument('--size', type=int, default=100000, help="Vectors in the synthetic catalog")
+    parser.add_argument('--dimensions', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    for result in benchmark(args.size, args.dimensions, args.queries, args.k):
+        print(f"{result['index']:<34} recall@{args.k}={result['recall']:.3f}  "
+              f"{result['ms']:.2f} ms/query  {result['candidates']} candidates")
@@ -1,16 +1,114 @@
 import requests
 import streamlit as st
 from helpers.database import add_book, get_all_books, search_local_books, init_db
+from helpers.open_library import get_open_library_client, get_response_cache, OpenLibraryError
 
-# Open Library API endpoint
-OPEN_LIBRARY_API_URL = "https://openlibrary.org/search.json"
+# How long Open Library responses are served from the cache (seconds), and
+# for how much longer they are served stale while refreshed in the background
+SEARCH_TTL = 60 * 60
+SEARCH_STALE_TTL = 24 * 60 * 60
+WORK_TTL = 24 * 60 * 60
+WORK_STALE_TTL = 7 * 24 * 60 * 60
 
 # Initialize database
 init_db()
 
+def fetch_search_results(query, max_results=10):
+    """
+    Query Open Library's search endpoint, bypassing the response cache.
+
+    Returns:
+        list: Books found (possibly empty)
+
+    Raises:
+        OpenLibraryError: On an error status
+        requests.RequestException: On timeouts or connection errors
+    """
+    client = get_open_library_client()
+    response = client.search(query, max_results)
+    if response.status_code != 200:
+        raise OpenLibraryError(response.status_code)
+    
+    books = []
+    for doc in response.json().get('docs') or []:
+        book = {
+            'title': doc.get('title', 'Unknown Title'),
+            'author': ', '.join(doc.get('author_name', ['Unknown Author'])),
+            'year': str(doc.get('first_publish_year', 'Unknown')),
+            'genre': ', '.join(doc.get('subject', ['Unknown'])[:3]),  # Get first 3 subjects
+            'description': 'Available on Open Library',
+            'cover_image': client.cover_url(doc.get('cover_i'), 'M'),
+            'status': 'To Read',
+            'rating': 0
+        }
+        books.append(book)
+    return books
+
+def fetch_book_details(book_id):
+    """
+    Fetch an Open Library work, bypassing the response cache.
+
+    Returns:
+        dict: Book details
+
+    Raises:
+        OpenLibraryError: On an error status
+        requests.RequestException: On timeouts or connection errors
+    """
+    client = get_open_library_client()
+    response = client.work(book_id)
+    if response.status_code != 200:
+        raise OpenLibraryError(response.status_code)
+    
+    data = response.json()
+    description = data.get('description', 'No description available')
+    if isinstance(description, dict):
+        description = description.get('value', 'No description available')
+    
+    return {
+        'title': data.get('title', 'Unknown Title'),
+        'author': data.get('authors', [{'name': 'Unknown Author'}])[0].get('name'),
+        'year': data.get('first_publish_date', 'Unknown')[:4],
+        'genre': ', '.join(data.get('subjects', ['Unknown'])[:3]),
+        'description': description,
+        'cover_image': client.cover_url((data.get('covers') or [None])[0], 'L')
+    }
+
+def cached_search(query, max_results=10):
+    """
+    Search Open Library through the response cache, without any UI output.
+
+    Raises:
+        OpenLibraryError, requests.RequestException: As fetch_search_results
+    """
+    key = f"search:{max_results}:{' '.join(query.casefold().split())}"
+    return get_response_cache().get_or_fetch(
+        key,
+        lambda: fetch_search_results(query, max_results),
+        SEARCH_TTL,
+        SEARCH_STALE_TTL
+    )
+
+def cached_book_details(book_id):
+    """
+    Fetch an Open Library work through the response cache, without any UI output.
+
+    Raises:
+        OpenLibraryError, requests.RequestException: As fetch_book_details
+    """
+    return get_response_cache().get_or_fetch(
+        f"work:{book_id}",
+        lambda: fetch_book_details(book_id),
+        WORK_TTL,
+        WORK_STALE_TTL
+    )
+
 def search_books(query, max_results=10):
     """
     Search for books using the Open Library API.
+
+    Results are served from the response cache when possible (see
+    SEARCH_TTL and SEARCH_STALE_TTL).
     """
     try:
         # Clean and validate the query
@@ -18,44 +116,21 @@ def search_books(query, max_results=10):
             st.warning("Please enter a search query.")
             return []
         
-        # Parameters for Open Library API
-        params = {
-            'q': query,
-            'limit': max_results,
-            'fields': 'title,author_name,first_publish_year,subject,cover_i'
-        }
-        
-        # Make the request
-        response = requests.get(OPEN_LIBRARY_API_URL, params=params)
-        
-        # Check response status
-        if response.status_code != 200:
-            st.error(f"Error fetching data from Open Library: {response.status_code}")
-            return []
-        
-        data = response.json()
+        books = cached_search(query, max_results)
         
         # Check if we got any results
-        if 'docs' not in data or not data['docs']:
+        if not books:
             st.info("No books found. Try a different search term.")
             return []
         
-        books = []
-        for doc in data['docs']:
-            book = {
-                'title': doc.get('title', 'Unknown Title'),
-                'author': ', '.join(doc.get('author_name', ['Unknown Author'])),
-                'year': str(doc.get('first_publish_year', 'Unknown')),
-                'genre': ', '.join(doc.get('subject', ['Unknown'])[:3]),  # Get first 3 subjects
-                'description': 'Available on Open Library',
-                'cover_image': f"https://covers.openlibrary.org/b/id/{doc.get('cover_i')}-M.jpg" if doc.get('cover_i') else None,
-                'status': 'To Read',
-                'rating': 0
-            }
-            books.append(book)
-        
         return books
         
+    except OpenLibraryError as e:
+        st.error(f"Error fetching data from Open Library: {e.status_code}")
+        return []
+    except requests.Timeout:
+        st.error("Open Library did not respond in time. Please try again.")
+        return []
     except Exception as e:
         st.error(f"Error searching books: {str(e)}")
         return []
@@ -63,27 +138,19 @@ def search_books(query, max_results=10):
 def get_book_details(book_id):
     """
     Get detailed information about a specific book from Open Library.
+
+    Works are served from the response cache when possible (see WORK_TTL
+    and WORK_STALE_TTL).
     """
     try:
-        response = requests.get(f"https://openlibrary.org/works/{book_id}.json")
-        
-        if response.status_code != 200:
-            st.error(f"Error fetching book details: {response.status_code}")
-            return {}
-        
-        data = response.json()
-        
-        book_details = {
-            'title': data.get('title', 'Unknown Title'),
-            'author': data.get('authors', [{'name': 'Unknown Author'}])[0].get('name'),
-            'year': data.get('first_publish_date', 'Unknown')[:4],
-            'genre': ', '.join(data.get('subjects', ['Unknown'])[:3]),
-            'description': data.get('description', {}).get('value', 'No description available'),
-            'cover_image': f"https://covers.openlibrary.org/b/id/{data.get('covers', [None])[0]}-L.jpg" if data.get('covers') else None
-        }
-        
-        return book_details
+        return cached_book_details(book_id)
         
+    except OpenLibraryError as e:
+        st.error(f"Error fetching book details: {e.status_code}")
+        return {}
+    except requests.Timeout:
+        st.error("Open Library did not respond in time. Please try again.")
+        return {}
     except Exception as e:
         st.error(f"Error fetching book details: {str(e)}")
         return {}
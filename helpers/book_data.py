@@ -1,114 +1,45 @@
-import json
-import os
-from datetime import datetime
-import streamlit as st
-from pymongo import MongoClient
-import certifi  # Import certifi for SSL certificate handling
+from helpers.library_store import get_store
+from helpers.aggregations import compute_facets
 
-def get_database():
-    """
-    Connect to MongoDB and return the database object.
-    """
-    try:
-        # Get MongoDB URI from secrets
-        MONGODB_URI = st.secrets["MONGODB"]["MONGODB_URL"]
-        
-        # Create client with SSL/TLS configuration
-        client = MongoClient(
-            MONGODB_URI,
-            tls=True,  # Enable TLS/SSL
-            tlsCAFile=certifi.where(),  # Use certifi's CA bundle
-            retryWrites=True,
-            w="majority"
-        )
-        
-        # Test connection
-        client.admin.command('ping')
-        print("✅ Connected to MongoDB successfully!")  # Debug statement
-        
-        # Return database
-        return client.library_database
-    except Exception as e:
-        st.error(f"❌ Database connection error: {str(e)}")
-        return None
+# Data-access functions are shims over LibraryStore; the count helpers
+# below work on plain lists of book dictionaries (use
+# helpers.library_store.get_library_facets for the cached library-wide counts).
 
-def load_books():
+def load_books(projection='full'):
     """
     Fetch all books from the database.
+
+    Args:
+        projection (str or list): 'card', 'chart', 'export', 'full' or a
+            list of fields
     """
-    try:
-        db = get_database()
-        if db is not None:
-            books_collection = db.books
-            books = list(books_collection.find({}, {'_id': 0}))
-            print(f"📚 Loaded {len(books)} books from the database")  # Debug statement
-            return books
-        return []
-    except Exception as e:
-        st.error(f"❌ Error loading books: {str(e)}")
-        return []
+    return get_store().load_books(projection)
 
 def save_book(book_data):
     """
     Save a new book to the database.
     """
-    try:
-        db = get_database()
-        if db is not None:  # Proper None check
-            books_collection = db.books
-            # Add unique identifier if not present
-            if 'id' not in book_data:
-                book_data['id'] = str(datetime.now().timestamp())
-            # Add timestamp
-            book_data['date_added'] = datetime.now().strftime('%Y-%m-%d')
-            # Insert the book
-            result = books_collection.insert_one(book_data)
-            # Check if insertion was successful
-            if result.inserted_id:
-                print(f"✅ Book inserted with ID: {result.inserted_id}")  # Debug statement
-                return True
-        return False
-    except Exception as e:
-        st.error(f"❌ Error saving book: {str(e)}")
-        return False
-
-def get_book_status_counts(books):
-    """
-    Get counts of books by status.
-    """
-    status_counts = {}
-    for book in books:
-        status = book.get('status', 'Unknown')
-        status_counts[status] = status_counts.get(status, 0) + 1
-    return status_counts
+    return get_store().add_book(book_data)
 
-def search_local_books(query):
+def search_local_books(query, mode='regex'):
     """
     Search for books in the local database.
+
+    Args:
+        query (str): Search text
+        mode (str): 'regex' for substring matching, 'text' for the text
+            index, 'fuzzy' for typo-tolerant ranked matches
+
+    Returns:
+        list: Matching books
     """
-    try:
-        db = get_database()
-        if db and query:
-            books_collection = db.books
-            search_query = {
-                "$or": [
-                    {"title": {"$regex": query, "$options": "i"}},
-                    {"author": {"$regex": query, "$options": "i"}},
-                    {"genre": {"$regex": query, "$options": "i"}}
-                ]
-            }
-            books = list(books_collection.find(search_query, {'_id': 0}))
-            return books
-        return []
-    except Exception as e:
-        st.error(f"❌ Error searching books: {str(e)}")
-        return []
+    return get_store().search(query, mode)
 
-def get_all_books():
+def get_all_books(projection='full'):
     """
     Fetch all books from the database.
     """
-    return load_books()
+    return load_books(projection)
 
 def add_book(book_data):
     """
@@ -116,85 +47,17 @@ def add_book(book_data):
     """
     return save_book(book_data)
 
-def get_genre_counts(books):
-    """
-    Get counts of books by genre.
-    """
-    genre_counts = {}
-    for book in books:
-        genre = book.get('genre', 'Unknown')
-        if genre and genre != 'Unknown':
-            # Handle multiple genres separated by commas
-            for g in genre.split(', '):
-                genre_counts[g] = genre_counts.get(g, 0) + 1
-    return genre_counts
-
-def get_year_counts(books):
+def get_book_by_id(book_id, projection='full'):
     """
-    Get counts of books by publication year.
+    Get a book by its ID from the database (every field by default).
     """
-    year_counts = {}
-    for book in books:
-        year = book.get('year', 'Unknown')
-        if year and year != 'Unknown':
-            try:
-                # Convert to string in case it's a number
-                year = str(year)
-                year_counts[year] = year_counts.get(year, 0) + 1
-            except Exception:
-                continue
-    return year_counts
-
-def get_book_by_id(book_id):
-    """
-    Get a book by its ID from the database.
-    """
-    try:
-        db = get_database()
-        if db is not None:  # Explicitly check if database is not None
-            books_collection = db.books
-            book = books_collection.find_one({"id": book_id}, {'_id': 0})
-            if book is not None:  # Explicitly check if book is not None
-                return book
-            else:
-                print(f"❌ Book with ID {book_id} not found in the database.")
-                return None
-        else:
-            print("❌ Database connection failed.")
-            return None
-    except Exception as e:
-        st.error(f"❌ Error getting book: {str(e)}")
-        return None
+    return get_store().get_book(book_id, projection)
 
 def update_book(book_id, updated_data):
     """
     Update an existing book in the database.
     """
-    try:
-        db = get_database()
-        if db is not None:
-            books_collection = db.books
-
-            # Update the book with the given ID
-            result = books_collection.update_one(
-                {"id": book_id},  # Find the book by its ID
-                {"$set": updated_data}  # Update the fields with new data
-            )
-
-            if result.modified_count > 0:
-                print(f"✅ Book updated with ID: {book_id}")
-                return True
-            else:
-                print("❌ No changes made to the book.")
-                return False
-        else:
-            print("❌ Database connection failed.")
-            return False
-    except Exception as e:
-        st.error(f"❌ Error updating book: {str(e)}")
-        return False
-        
-
+    return get_store().update_book(book_id, updated_data)
 
 def save_books(books):
     """
@@ -206,29 +69,7 @@ def save_books(books):
     Returns:
         bool: True if successful, False otherwise
     """
-    try:
-        db = get_database()
-        if db is None:  # Explicitly check if database is None
-            print("❌ Database connection failed.")
-            return False
-        
-        books_collection = db.books
-        
-        # Insert all books
-        if books:
-            result = books_collection.insert_many(books)
-            if result.inserted_ids:  # Directly check inserted_ids
-                print(f"✅ Successfully saved {len(result.inserted_ids)} books.")
-                return True
-            else:
-                print("❌ Failed to save books.")
-                return False
-        else:
-            print("❌ No books to save.")
-            return False
-    except Exception as e:
-        st.error(f"❌ Error saving books: {str(e)}")
-        return False
+    return get_store().insert_books(books)
 
 def update_book_status(book_id, new_status):
     """
@@ -241,32 +82,22 @@ def update_book_status(book_id, new_status):
     Returns:
         bool: True if successful, False otherwise
     """
-    try:
-        db = get_database()
-        if db is None:  # Explicitly check if database is None
-            print("❌ Database connection failed.")
-            return False
-        
-        books_collection = db.books
-        result = books_collection.update_one(
-            {"id": book_id},
-            {"$set": {"status": new_status}}
-        )
-        
-        if result.modified_count > 0:
-            print(f"✅ Updated book status for ID: {book_id}")
-            return True
-        else:
-            print("❌ No changes made to the book.")
-            return False
-    except Exception as e:
-        st.error(f"❌ Error updating book status: {str(e)}")
-        return False
+    return get_store().update_book(book_id, {"status": new_status})
 
 def get_book_status_counts(books):
-    """Get counts of books by status"""
-    status_counts = {}
-    for book in books:
-        status = book.get('status', 'Unknown')
-        status_counts[status] = status_counts.get(status, 0) + 1
-    return status_counts
+    """
+    Get counts of books by status.
+    """
+    return dict(compute_facets(books).status)
+
+def get_genre_counts(books):
+    """
+    Get counts of books by genre.
+    """
+    return dict(compute_facets(books).genre)
+
+def get_year_counts(books):
+    """
+    Get counts of books by publication year.
+    """
+    return dict(compute_facets(books).year)
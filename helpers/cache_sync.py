@@ -0,0 +1,182 @@
+import threading
+import time
+import streamlit as st
+from helpers.library_store import get_store, get_mongodb_setting
+
+# How the in-process book cache follows writes made by other replicas:
+# 'change_stream' (needs a replica set), 'polling' (any server, for local
+# development and tests) or 'off'
+DEFAULT_SYNC_MODE = 'off'
+DEFAULT_POLL_INTERVAL = 5  # seconds
+RETRY_DELAY = 5  # seconds
+
+# Running watchers, one per library collection
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+class ChangeStreamWatcher:
+    """
+    Follow the books collection's change stream and apply every insert,
+    update and delete to a LibraryStore's cache.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.resume_token = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start following the change stream in a daemon thread."""
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"cache-sync-{self.store.collection_name}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Ask the watcher thread to stop after its current event."""
+        self._stop.set()
+
+    def _run(self):
+        first_attempt = True
+        while not self._stop.is_set():
+            try:
+                books_collection = self.store.get_collection()
+                if books_collection is None:
+                    time.sleep(RETRY_DELAY)
+                    continue
+                with books_collection.watch(
+                    full_document='updateLookup',
+                    resume_after=self.resume_token,
+                    max_await_time_ms=1000
+                ) as stream:
+                    if self.resume_token is None:
+                        # The stream covers every write from now on; rescan
+                        # so the cache also holds every write before it
+                        self.store.invalidate()
+                    while not self._stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is not None:
+                            self.store.apply_change(change)
+                        self.resume_token = stream.resume_token
+            except Exception as e:
+                # Events missed since the last token cannot be replayed, so
+                # fall back to a rescan
+                print(f"❌ Change stream interrupted: {str(e)}")  # Debug statement
+                if self.resume_token is not None or first_attempt:
+                    self.resume_token = None
+                    self.store.invalidate()
+                time.sleep(RETRY_DELAY)
+            first_attempt = False
+
+
+class PollingWatcher:
+    """
+    Stand-in for ChangeStreamWatcher on servers without change streams.
+
+    Periodically snapshots the collection, diffs it against the previous
+    snapshot and feeds the differences to LibraryStore.apply_change as
+    change events, so the cache is maintained through the same code path.
+    """
+
+    def __init__(self, store, interval=DEFAULT_POLL_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start polling in a daemon thread."""
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"cache-poll-{self.store.collection_name}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Ask the polling thread to stop."""
+        self._stop.set()
+
+    def poll(self):
+        """
+        Take one snapshot and apply the changes since the previous one.
+
+        Returns:
+            list: Change events that were applied
+        """
+        books_collection = self.store.get_collection()
+        if books_collection is None:
+            return []
+        snapshot = {book['_id']: book for book in books_collection.find({})}
+        if self._snapshot is None:
+            # Later polls diff against this snapshot; rescan so the cache
+            # starts from it too
+            self._snapshot = snapshot
+            self.store.invalidate()
+            return []
+
+        changes = []
+        for object_id, book in snapshot.items():
+            previous = self._snapshot.get(object_id)
+            if previous is None:
+                changes.append({'operationType': 'insert', 'documentKey': {'_id': object_id}, 'fullDocument': book})
+            elif previous != book:
+                changes.append({'operationType': 'replace', 'documentKey': {'_id': object_id}, 'fullDocument': book})
+        for object_id in self._snapshot.keys() - snapshot.keys():
+            changes.append({'operationType': 'delete', 'documentKey': {'_id': object_id}})
+
+        self._snapshot = snapshot
+        for change in changes:
+            self.store.apply_change(change)
+        return changes
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Cache polling failed: {str(e)}")  # Debug statement
+            self._stop.wait(self.interval)
+
+
+def start_cache_sync(store=None, mode=None):
+    """
+    Start keeping a store's cache in sync with writes from other replicas.
+
+    Safe to call on every Streamlit rerun: at most one watcher runs per
+    library collection.
+
+    Args:
+        store (LibraryStore, optional): Store to keep in sync (default store if None)
+        mode (str, optional): 'change_stream', 'polling' or 'off'; read from
+            MONGODB_CACHE_SYNC in secrets/environment if None
+
+    Returns:
+        ChangeStreamWatcher or PollingWatcher or None: The running watcher
+    """
+    store = store or get_store()
+    mode = mode or get_mongodb_setting("MONGODB_CACHE_SYNC", DEFAULT_SYNC_MODE)
+    if mode == 'off':
+        return None
+
+    with _watchers_lock:
+        watcher = _watchers.get(store.collection_name)
+        if watcher is not None:
+            return watcher
+        if mode == 'change_stream':
+            watcher = ChangeStreamWatcher(store)
+        elif mode == 'polling':
+            interval = float(get_mongodb_setting("MONGODB_CACHE_POLL_INTERVAL", DEFAULT_POLL_INTERVAL))
+            watcher = PollingWatcher(store, interval)
+        else:
+            st.error(f"❌ Unknown cache sync mode: {mode}")
+            return None
+        watcher.start()
+        _watchers[store.collection_name] = watcher
+        print(f"✅ Started {mode} cache sync for '{store.collection_name}'")  # Debug statement
+        return watcher
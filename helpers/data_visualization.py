@@ -2,23 +2,32 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import streamlit as st
-from helpers.book_data import get_book_status_counts, get_genre_counts, get_year_counts
+from helpers.library_snapshot import as_snapshot, additions_by_date
+from helpers.aggregations import LibraryFacets, compute_facets
+
+def as_facets(books):
+    """
+    Accept either library facets or a list of books and return facets.
+    """
+    if isinstance(books, LibraryFacets):
+        return books
+    return compute_facets(books)
 
 def create_reading_status_chart(books):
     """
     Create a pie chart showing the distribution of reading status
     
     Args:
-        books (list): List of book dictionaries
+        books (list or LibraryFacets): Book dictionaries or library facets
         
     Returns:
         plotly.graph_objects.Figure: Plotly figure object
     """
-    status_counts = get_book_status_counts(books)
+    counts_by_status = as_facets(books).status
     
     # Prepare data for the chart
-    statuses = list(status_counts.keys())
-    counts = list(status_counts.values())
+    statuses = list(counts_by_status.keys())
+    counts = list(counts_by_status.values())
     
     # Define a color map for consistent colors
     color_map = {
@@ -55,26 +64,15 @@ def create_genre_distribution_chart(books):
     Create a bar chart showing the distribution of book genres
     
     Args:
-        books (list): List of book dictionaries
+        books (list or LibraryFacets): Book dictionaries or library facets
         
     Returns:
         plotly.graph_objects.Figure: Plotly figure object
     """
-    genre_counts = get_genre_counts(books)
-    
-    # If a book has multiple genres (comma-separated), count each genre separately
-    expanded_genre_counts = {}
-    for genre, count in genre_counts.items():
-        if ', ' in genre:
-            for g in genre.split(', '):
-                expanded_genre_counts[g] = expanded_genre_counts.get(g, 0) + count
-        else:
-            expanded_genre_counts[genre] = expanded_genre_counts.get(genre, 0) + count
-    
-    # Sort genres by count and take top 10
-    sorted_genres = sorted(expanded_genre_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-    genres = [item[0] for item in sorted_genres]
-    counts = [item[1] for item in sorted_genres]
+    # Multiple (comma-separated) genres are counted separately; top 10
+    top_genres = [(genre, count) for genre, count in as_facets(books).genre.most_common() if genre][:10]
+    genres = [genre for genre, _ in top_genres]
+    counts = [count for _, count in top_genres]
     
     # Create the bar chart
     fig = go.Figure(data=[go.Bar(
@@ -98,23 +96,16 @@ def create_yearly_acquisition_chart(books):
     Create a line chart showing books added over time
     
     Args:
-        books (list): List of book dictionaries
+        books (list or pandas.DataFrame): Book dictionaries or a library snapshot
         
     Returns:
         plotly.graph_objects.Figure: Plotly figure object
     """
-    # Prepare data - count books by date added
-    dates = {}
-    for book in books:
-        date_added = book.get('date_added', 'Unknown')
-        if date_added and date_added != 'Unknown':
-            dates[date_added] = dates.get(date_added, 0) + 1
-    
-    # Sort dates and create cumulative sum
-    sorted_dates = sorted(dates.items())
-    dates_list = [item[0] for item in sorted_dates]
-    counts = [item[1] for item in sorted_dates]
-    cumulative = [sum(counts[:i+1]) for i in range(len(counts))]
+    # Count books by date added, oldest first, with a running total
+    added = additions_by_date(as_snapshot(books))
+    dates_list = list(added.index)
+    counts = added.tolist()
+    cumulative = added.cumsum().tolist()
     
     # Create the line chart
     fig = go.Figure()
@@ -153,22 +144,15 @@ def create_publication_year_chart(books):
     Create a histogram showing the distribution of publication years
     
     Args:
-        books (list): List of book dictionaries
+        books (list or pandas.DataFrame): Book dictionaries or a library snapshot
         
     Returns:
         plotly.graph_objects.Figure: Plotly figure object
     """
     # Get years that are valid numbers
-    years = []
-    for book in books:
-        year = book.get('year', 'Unknown')
-        if year and year != 'Unknown':
-            try:
-                years.append(int(year))
-            except (ValueError, TypeError):
-                continue
-    
-    if not years:
+    years = as_snapshot(books)['year'].dropna().astype(int)
+    
+    if years.empty:
         # Return empty figure if no valid years
         fig = go.Figure()
         fig.update_layout(
@@ -182,8 +166,8 @@ def create_publication_year_chart(books):
     
     # Create the histogram
     fig = px.histogram(
-        x=years,
-        nbins=min(20, len(set(years))),
+        x=years.tolist(),
+        nbins=min(20, years.nunique()),
         labels={'x': 'Publication Year', 'y': 'Number of Books'},
         color_discrete_sequence=['#1E88E5']
     )
@@ -203,13 +187,14 @@ def create_reading_progress_chart(books):
     Create a gauge chart showing reading progress
     
     Args:
-        books (list): List of book dictionaries
+        books (list or pandas.DataFrame): Book dictionaries or a library snapshot
         
     Returns:
         plotly.graph_objects.Figure: Plotly figure object
     """
-    read_count = len([book for book in books if book.get('status') == 'Read'])
-    total_count = len(books)
+    df = as_snapshot(books)
+    read_count = int((df['status'] == 'Read').sum())
+    total_count = len(df)
     
     read_percentage = (read_count / total_count * 100) if total_count > 0 else 0
     
@@ -0,0 +1,163 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from helpers.book_api import cached_search, cached_book_details
+
+# Concurrent Open Library lookups; the client's rate limiter still caps
+# the request rate, the pool only overlaps their latency
+DEFAULT_MAX_WORKERS = 8
+# Book fields filled in from Open Library when they are empty
+ENRICHABLE_FIELDS = ['year', 'genre', 'description', 'cover_image']
+
+_WORK_ID_RE = re.compile(r'^(?:/works/)?(OL\d+W)$', re.IGNORECASE)
+_ISBN_RE = re.compile(r'^(?:\d{9}[\dX]|\d{13})$')
+
+
+def classify_lookup(lookup):
+    """
+    Tell what kind of identifier a lookup string is.
+
+    Returns:
+        tuple: ('work', work id), ('isbn', bare ISBN) or ('title', text)
+    """
+    text = str(lookup).strip()
+    match = _WORK_ID_RE.match(text)
+    if match:
+        return 'work', match.group(1).upper()
+    isbn = text.upper().replace('-', '').replace(' ', '')
+    if _ISBN_RE.match(isbn):
+        return 'isbn', isbn
+    return 'title', text
+
+
+def resolve_lookup(lookup):
+    """
+    Resolve one title, ISBN or work id to Open Library book details.
+
+    Goes through the response cache, so repeated lookups are free.
+
+    Returns:
+        dict or None: Book details, or None if nothing matched
+    """
+    kind, value = classify_lookup(lookup)
+    if kind == 'work':
+        return cached_book_details(value) or None
+    query = f"isbn:{value}" if kind == 'isbn' else value
+    results = cached_search(query, 1)
+    if not results:
+        return None
+    details = dict(results[0])
+    # Search results only carry a placeholder description
+    details.pop('description', None)
+    return details
+
+
+def lookup_books(lookups, max_workers=DEFAULT_MAX_WORKERS, timeout=None, progress_callback=None):
+    """
+    Resolve many titles, ISBNs or work ids concurrently.
+
+    Lookups run on a bounded thread pool; duplicates are resolved once,
+    and concurrent requests for the same Open Library resource share one
+    fetch through the response cache. Failures and lookups still running
+    at the timeout are reported rather than raised, so callers always get
+    the results that did arrive.
+
+    Args:
+        lookups (list): Titles, ISBNs or Open Library work ids
+        max_workers (int): Threads resolving lookups at once
+        timeout (float, optional): Seconds to wait before returning partial
+            results (no limit if None)
+        progress_callback (callable, optional): Called as lookups finish
+            with (finished, total)
+
+    Returns:
+        dict: 'found' (lookup -> details), 'not_found', 'errors'
+            (lookup -> message) and 'pending' (lookups not finished in time)
+    """
+    unique = list(dict.fromkeys(lookup for lookup in lookups if lookup))
+    report = {'found': {}, 'not_found': [], 'errors': {}, 'pending': []}
+    if not unique:
+        return report
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='open-library')
+    futures = {executor.submit(resolve_lookup, lookup): lookup for lookup in unique}
+    not_done = set(futures)
+    finished = 0
+    try:
+        while not_done:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            done, not_done = wait(not_done, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                lookup = futures[future]
+                try:
+                    details = future.result()
+                except Exception as e:
+                    report['errors'][lookup] = str(e)
+                else:
+                    if details:
+                        report['found'][lookup] = details
+                    else:
+                        report['not_found'].append(lookup)
+            finished += len(done)
+            if progress_callback and done:
+                progress_callback(finished, len(unique))
+    finally:
+        # Don't start lookups nobody will wait for
+        executor.shutdown(wait=False, cancel_futures=True)
+    report['pending'] = [futures[future] for future in not_done]
+    return report
+
+
+def title_author_lookup(book):
+    """
+    Default lookup for a book: its title and author as a search query.
+    """
+    return ' '.join(str(book.get(field) or '') for field in ('title', 'author')).strip()
+
+
+def needs_enrichment(book):
+    """True if any of ENRICHABLE_FIELDS is empty."""
+    return any(book.get(field) in (None, '', 'Unknown') for field in ENRICHABLE_FIELDS)
+
+
+def enrich_books(books, lookup=title_author_lookup, max_workers=DEFAULT_MAX_WORKERS,
+                 timeout=None, progress_callback=None):
+    """
+    Fill empty year/genre/description/cover fields of books from Open Library.
+
+    Books are updated in place; fields that already have a value are never
+    overwritten.
+
+    Args:
+        books (list): Book dictionaries
+        lookup (callable): Maps a book to the title, ISBN or work id to
+            look up
+        max_workers, timeout, progress_callback: As for lookup_books
+
+    Returns:
+        dict: The lookup_books report plus 'enriched', the number of books
+            that gained at least one field
+    """
+    pending_books = [(book, lookup(book)) for book in books if needs_enrichment(book)]
+    report = lookup_books(
+        [key for _, key in pending_books],
+        max_workers=max_workers,
+        timeout=timeout,
+        progress_callback=progress_callback
+    )
+    enriched = 0
+    for book, key in pending_books:
+        details = report['found'].get(key)
+        if not details:
+            continue
+        filled = False
+        for field in ENRICHABLE_FIELDS:
+            if book.get(field) in (None, '', 'Unknown') and details.get(field) not in (None, '', 'Unknown'):
+                book[field] = details[field]
+                filled = True
+        enriched += filled
+    report['enriched'] = enriched
+    return report
@@ -1,185 +1,560 @@
 import pandas as pd
 import json
-import streamlit as st
+import csv
+import zlib
 import io
 import uuid
 from datetime import datetime
-from helpers.database import get_database
+from helpers.library_store import get_store, resolve_projection, PROJECTIONS, DEFAULT_BULK_BATCH_SIZE, DEFAULT_CURSOR_BATCH_SIZE
+from helpers.enrichment import enrich_books, title_author_lookup
 
-def export_to_csv(books):
+# Fields written by a basic (not "all metadata") export
+BASIC_EXPORT_FIELDS = PROJECTIONS['export']
+# Preferred column order for CSV exports; other fields follow alphabetically
+EXPORT_FIELD_ORDER = ['id', 'title', 'author', 'year', 'genre', 'status', 'rating',
+                      'pages', 'progress', 'date_added', 'description', 'notes', 'cover_image']
+# Encoded bytes buffered before an export chunk is yielded
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def _ordered_fields(fields):
+    known = [field for field in EXPORT_FIELD_ORDER if field in fields]
+    return known + sorted(field for field in fields if field not in EXPORT_FIELD_ORDER)
+
+def _encode_records(books, export_format, fields):
+    """
+    Encode books one at a time as text pieces of a CSV, JSON or NDJSON file.
+    """
+    if export_format == 'csv':
+        line = io.StringIO()
+        writer = csv.DictWriter(line, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        yield line.getvalue()
+        for book in books:
+            line.seek(0)
+            line.truncate()
+            writer.writerow(book)
+            yield line.getvalue()
+    elif export_format == 'json':
+        yield '['
+        separator = '\n'
+        for book in books:
+            yield separator + json.dumps(book, indent=4, default=str)
+            separator = ',\n'
+        yield '\n]\n'
+    elif export_format == 'ndjson':
+        for book in books:
+            yield json.dumps(book, default=str) + '\n'
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+def iter_export_chunks(export_format='csv', fields=None, books=None,
+                       batch_size=DEFAULT_CURSOR_BATCH_SIZE, compress=False):
     """
-    Export books to CSV file
+    Stream the library as encoded export chunks.
+    
+    Books are read from a server-side cursor (or the given iterable) and
+    encoded as they arrive, so memory use does not grow with library size.
     
     Args:
-        books (list): List of book dictionaries
+        export_format (str): 'csv', 'json' or 'ndjson'
+        fields (str or list, optional): Projection name ('export', 'full')
+            or fields to export (all fields if None)
+        books (iterable, optional): Books to export instead of the database
+        batch_size (int): Documents per cursor round trip
+        compress (bool): gzip the output on the fly
         
-    Returns:
-        BytesIO: CSV file as bytes object
+    Yields:
+        bytes: Consecutive pieces of the export file
     """
-    if not books:
-        return None
-    
-    # Convert books to DataFrame
-    df = pd.DataFrame(books)
+    fields = resolve_projection(fields)
+    if books is None:
+        books = get_store().iter_books(projection=fields, batch_size=batch_size)
+        if export_format == 'csv' and fields is None:
+            fields = get_store().field_names()
+    elif export_format == 'csv' and fields is None:
+        # Column names must be known up front for a plain list
+        books = list(books)
+        fields = {field for book in books for field in book}
+    if export_format == 'csv':
+        fields = _ordered_fields(fields)
+    elif fields:
+        books = ({field: book.get(field) for field in fields} for book in books)
     
-    # Create CSV from DataFrame
-    csv_buffer = io.BytesIO()
-    df.to_csv(csv_buffer, index=False)
-    csv_buffer.seek(0)
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+    buffer = []
+    buffered = 0
+    for piece in _encode_records(books, export_format, fields):
+        data = piece.encode('utf-8')
+        if compressor:
+            data = compressor.compress(data)
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= EXPORT_CHUNK_BYTES:
+            yield b''.join(buffer)
+            buffer = []
+            buffered = 0
+    if compressor:
+        buffer.append(compressor.flush())
+    if buffer:
+        yield b''.join(buffer)
+
+def export_library_to_file(path, export_format=None, fields=None, compress=None):
+    """
+    Stream the library to a file on disk.
     
-    return csv_buffer
+    Args:
+        path (str): Output file; format and compression are inferred from
+            the extension (.csv, .json, .ndjson, optionally .gz) unless given
+        export_format (str, optional): 'csv', 'json' or 'ndjson'
+        fields (str or list, optional): Projection name or fields to export
+            (all fields if None)
+        compress (bool, optional): gzip the output
+        
+    Returns:
+        int: Bytes written
+    """
+    name = path[:-3] if path.endswith('.gz') else path
+    if compress is None:
+        compress = path.endswith('.gz')
+    if export_format is None:
+        export_format = name.rsplit('.', 1)[-1].lower()
+    written = 0
+    with open(path, 'wb') as f:
+        for chunk in iter_export_chunks(export_format, fields=fields, compress=compress):
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+# Records validated and written per chunk by the streaming importer
+DEFAULT_IMPORT_CHUNK_SIZE = 1000
+# Characters read from a JSON upload at a time
+JSON_READ_SIZE = 64 * 1024
+# Longest single JSON record accepted; a record still undecodable at this
+# size is malformed, not truncated
+MAX_JSON_RECORD_CHARS = 1024 * 1024
 
-def export_to_json(books):
+REQUIRED_FIELDS = ['title', 'author']
+
+class ImportFormatError(ValueError):
+    """Raised when an import file cannot be parsed as a list of books."""
+
+def prepare_imported_book(book):
     """
-    Export books to JSON file
+    Validate an imported record and fill in its id.
+
+    date_added is left alone: the merge stamps it on books it inserts, so
+    a default date never counts as a newer version of an existing book.
     
     Args:
-        books (list): List of book dictionaries
+        book (dict): Imported record
         
     Returns:
-        BytesIO: JSON file as bytes object
+        bool: True if the record is a valid book, False otherwise
     """
-    if not books:
-        return None
+    if not isinstance(book, dict):
+        return False
+    
+    # Check for required fields
+    if not all(field in book for field in REQUIRED_FIELDS):
+        return False
     
-    # Create JSON from books list
-    json_buffer = io.BytesIO()
-    json_buffer.write(json.dumps(books, indent=4).encode())
-    json_buffer.seek(0)
+    # Add ID if missing
+    if 'id' not in book or not book['id']:
+        book['id'] = str(uuid.uuid4())
     
-    return json_buffer
+    return True
 
-def import_from_csv(file):
+def iter_csv_chunks(file, chunk_size=DEFAULT_IMPORT_CHUNK_SIZE):
     """
-    Import books from CSV file
+    Read a CSV file as lists of book dictionaries, chunk_size rows at a time.
     
     Args:
-        file: Uploaded CSV file
+        file: Uploaded CSV file or path
+        chunk_size (int): Rows per chunk
         
-    Returns:
-        tuple: (success boolean, message string, imported books list)
+    Yields:
+        list: Book dictionaries for one chunk
     """
-    try:
-        # Read CSV file
-        df = pd.read_csv(file)
+    for df in pd.read_csv(file, chunksize=chunk_size):
+        if not all(field in df.columns for field in REQUIRED_FIELDS):
+            raise ImportFormatError("CSV is missing required fields (title, author)")
+        # Empty cells become None rather than NaN
+        df = df.astype(object).where(pd.notna(df), None)
+        yield df.to_dict('records')
+
+def iter_json_records(file, read_size=JSON_READ_SIZE, max_record_chars=MAX_JSON_RECORD_CHARS):
+    """
+    Incrementally parse a JSON array of books, or NDJSON (one book per line).
+    
+    Only the record being decoded is held in memory, never the whole file;
+    a record that does not decode within max_record_chars is rejected
+    instead of buffering the rest of the upload.
+    
+    Args:
+        file: Uploaded JSON file (binary) or text file object
+        read_size (int): Characters to read per refill
+        max_record_chars (int): Longest record accepted
         
-        # Convert DataFrame to list of dictionaries
-        books = df.to_dict('records')
+    Yields:
+        object: Each decoded record
+    """
+    stream = file
+    if not isinstance(file, io.TextIOBase):
+        stream = io.TextIOWrapper(file, encoding='utf-8')
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(read_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+    
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+    
+    try:
+        skip(' \t\r\n\ufeff')
+        is_array = pos < len(buffer) and buffer[pos] == '['
+        if is_array:
+            pos += 1
         
-        # Validate the imported data
-        required_fields = ['title', 'author']
-        for book in books:
-            # Check for required fields
-            if not all(field in book for field in required_fields):
-                return False, "CSV is missing required fields (title, author)", []
+        while True:
+            skip(' \t\r\n,' if is_array else ' \t\r\n')
+            if pos >= len(buffer):
+                if is_array:
+                    raise ImportFormatError("Invalid JSON format")
+                return
+            if is_array and buffer[pos] == ']':
+                return
             
-            # Add ID if missing
-            if 'id' not in book or not book['id']:
-                book['id'] = str(uuid.uuid4())
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                # A value ending exactly at the buffer edge may be truncated
+                complete = end < len(buffer) or eof
+            except json.JSONDecodeError:
+                if eof or len(buffer) - pos > max_record_chars:
+                    raise ImportFormatError("Invalid JSON format")
+                complete = False
             
-            # Add date_added if missing
-            if 'date_added' not in book or not book['date_added']:
-                book['date_added'] = datetime.now().strftime('%Y-%m-%d')
-        
-        return True, f"Successfully imported {len(books)} books", books
-        
-    except Exception as e:
-        return False, f"Error importing CSV: {str(e)}", []
+            if not complete:
+                fill()
+                continue
+            pos = end
+            yield record
+    finally:
+        if stream is not file:
+            stream.detach()
 
-def import_from_json(file):
+def iter_json_chunks(file, chunk_size=DEFAULT_IMPORT_CHUNK_SIZE):
+    """
+    Group records from iter_json_records into lists of chunk_size.
     """
-    Import books from JSON file
+    chunk = []
+    for record in iter_json_records(file):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_import_chunks(file, file_type, chunk_size=DEFAULT_IMPORT_CHUNK_SIZE):
+    """
+    Iterate an uploaded file as chunks of book dictionaries.
+    
+    Args:
+        file: Uploaded file
+        file_type (str): 'csv', 'json' or 'ndjson'
+        chunk_size (int): Records per chunk
+    """
+    if file_type == 'csv':
+        return iter_csv_chunks(file, chunk_size)
+    if file_type in ('json', 'ndjson'):
+        return iter_json_chunks(file, chunk_size)
+    raise ImportFormatError("Unsupported file type. Please upload a CSV or JSON file.")
+
+def import_books_stream(file, file_type, strategy='replace', chunk_size=DEFAULT_IMPORT_CHUNK_SIZE,
+                        batch_size=DEFAULT_BULK_BATCH_SIZE, progress_callback=None, preview_size=20,
+                        enrich=False):
+    """
+    Import books chunk by chunk straight into the database.
+    
+    Each chunk is validated, given ids, merged against the library and only
+    its inserted/updated books are bulk-written before the next chunk is
+    read. The merge holds only its id/ISBN/title-author indexes (built from
+    a projected cursor) and fetches an existing book when a record matches
+    it, so memory stays bounded by chunk_size plus the merge indexes.
     
     Args:
-        file: Uploaded JSON file
+        file: Uploaded CSV, JSON or NDJSON file
+        file_type (str): 'csv', 'json' or 'ndjson'
+        strategy (str): Merge strategy - 'newest', 'replace', 'keep' or 'add'
+        chunk_size (int): Records validated and written per chunk
+        batch_size (int): Books per bulk write round trip
+        progress_callback (callable, optional): Called after each chunk with
+            (records_read, bytes_read, total_bytes); total_bytes may be None
+        preview_size (int): Number of imported books to keep for display
+        enrich (bool): Fill missing year/genre/description/cover fields from
+            Open Library (looked up concurrently, by ISBN or title/author)
         
     Returns:
-        tuple: (success boolean, message string, imported books list)
+        tuple: (success boolean, message string, report dict); the report
+            holds 'read', 'rejected', 'inserted', 'updated', 'unchanged',
+            'written' and 'enriched' counts and a 'preview' list
     """
+    store = get_store()
+    merger = BookMerger(store.iter_books(MERGE_INDEX_FIELDS), strategy, get_book=store.get_book)
+    total_bytes = getattr(file, 'size', None)
+    report = {'read': 0, 'rejected': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0,
+              'written': 0, 'enriched': 0, 'preview': []}
+    
     try:
-        # Read JSON file
-        content = file.read().decode('utf-8')
-        books = json.loads(content)
-        
-        # Validate the imported data
-        if not isinstance(books, list):
-            return False, "JSON does not contain a list of books", []
-        
-        # Check each book for required fields
-        required_fields = ['title', 'author']
-        for book in books:
-            if not isinstance(book, dict):
-                return False, "JSON contains invalid book entries", []
+        for chunk in iter_import_chunks(file, file_type, chunk_size):
+            report['read'] += len(chunk)
+            valid = [book for book in chunk if prepare_imported_book(book)]
+            report['rejected'] += len(chunk) - len(valid)
+            if enrich:
+                report['enriched'] += enrich_books(valid, lookup=enrichment_lookup)['enriched']
             
-            # Check for required fields
-            if not all(field in book for field in required_fields):
-                return False, "JSON is missing required fields (title, author)", []
+            diff = merger.merge(valid)
+            for key in ('inserted', 'updated', 'unchanged'):
+                report[key] += len(diff[key])
+            to_write = diff['inserted'] + diff['updated']
+            if to_write:
+                result = store.bulk_upsert(to_write, batch_size=batch_size, only_changed=False)
+                if not result['ok']:
+                    return False, f"Error saving books: {'; '.join(result['errors'][:3])}", report
+                report['written'] += result['sent']
             
-            # Add ID if missing
-            if 'id' not in book or not book['id']:
-                book['id'] = str(uuid.uuid4())
-            
-            # Add date_added if missing
-            if 'date_added' not in book or not book['date_added']:
-                book['date_added'] = datetime.now().strftime('%Y-%m-%d')
-        
-        return True, f"Successfully imported {len(books)} books", books
-        
-    except json.JSONDecodeError:
-        return False, "Invalid JSON format", []
+            if len(report['preview']) < preview_size:
+                report['preview'].extend(valid[:preview_size - len(report['preview'])])
+            if progress_callback:
+                bytes_read = file.tell() if hasattr(file, 'tell') else None
+                progress_callback(report['read'], bytes_read, total_bytes)
+    except ImportFormatError as e:
+        return False, str(e), report
     except Exception as e:
-        return False, f"Error importing JSON: {str(e)}", []
+        return False, f"Error importing {file_type.upper()}: {str(e)}", report
+    
+    valid_count = report['read'] - report['rejected']
+    message = f"Successfully imported {valid_count} books"
+    if report['rejected']:
+        message += f" ({report['rejected']} invalid records skipped)"
+    return True, message, report
+
+# Fields that may hold an ISBN in imported or stored books
+ISBN_FIELDS = ['isbn', 'isbn13', 'isbn_13', 'isbn10', 'isbn_10']
+# Fields compared to decide which side of a conflict is newer
+TIMESTAMP_FIELDS = ['date_modified', 'date_added']
+MERGE_STRATEGIES = ['newest', 'replace', 'keep', 'add']
+# Fields the merge indexes are built from
+MERGE_INDEX_FIELDS = ['id', 'title', 'author'] + ISBN_FIELDS
+
+_LEADING_ARTICLES = ('the ', 'a ', 'an ')
+
+def normalize_isbn(book):
+    """
+    Return a book's ISBN as bare digits (and X), or None if it has none.
+    """
+    for field in ISBN_FIELDS:
+        value = book.get(field)
+        if value:
+            isbn = ''.join(ch for ch in str(value).upper() if ch.isdigit() or ch == 'X')
+            if len(isbn) in (10, 13):
+                return isbn
+    return None
 
-def merge_books(existing_books, imported_books, strategy='replace'):
+def enrichment_lookup(book):
     """
-    Merge imported books with existing books
+    Open Library lookup for an imported book: its ISBN, else title and author.
+    """
+    return normalize_isbn(book) or title_author_lookup(book)
+
+def normalize_title_author(book):
+    """
+    Return a (title, author) key that ignores case, punctuation, spacing
+    and leading articles, or None if either part is missing.
+    """
+    def clean(value):
+        text = ''.join(ch if ch.isalnum() else ' ' for ch in str(value or '').casefold())
+        return ' '.join(text.split())
     
-    Args:
-        existing_books (list): Existing books
-        imported_books (list): Imported books
-        strategy (str): Merge strategy - 'replace', 'keep', or 'add'
-        
-    Returns:
-        list: Merged books list
+    title = clean(book.get('title'))
+    for article in _LEADING_ARTICLES:
+        if title.startswith(article):
+            title = title[len(article):]
+            break
+    author = clean(book.get('author'))
+    if not title or not author:
+        return None
+    return title, author
+
+def _is_empty(value):
+    return value is None or value == '' or (isinstance(value, float) and value != value)
+
+def _timestamp(book):
+    for field in TIMESTAMP_FIELDS:
+        if not _is_empty(book.get(field)):
+            return str(book[field])
+    return None
+
+class BookMerger:
     """
-    if strategy == 'replace':
-        # Replace existing books with imported ones (based on ID)
-        existing_ids = {book.get('id'): i for i, book in enumerate(existing_books)}
-        result = existing_books.copy()
-        
-        for imported_book in imported_books:
-            if imported_book.get('id') in existing_ids:
-                # Replace existing book
-                result[existing_ids[imported_book.get('id')]] = imported_book
-            else:
-                # Add new book
-                result.append(imported_book)
-                
-        return result
-        
-    elif strategy == 'keep':
-        # Keep existing books when there's a conflict
-        existing_ids = {book.get('id') for book in existing_books}
-        
-        # Add only books that don't exist
-        result = existing_books.copy()
-        for imported_book in imported_books:
-            if imported_book.get('id') not in existing_ids:
-                result.append(imported_book)
-                
-        return result
-        
-    else:  # 'add' strategy
-        # Add all imported books as new entries
-        result = existing_books.copy()
+    One-pass merge of imported books into a library.
+    
+    Existing books are hash-indexed by id, ISBN and normalized
+    (title, author), so each imported book is matched in O(1). Indexes are
+    updated as books are merged, which also dedupes the import against
+    itself and lets a large import be merged chunk by chunk.
+    
+    The indexes map to book ids, not to the books themselves. By default
+    the merger keeps the whole merged library in `books`; given a
+    `get_book` callable it keeps nothing but the indexes and fetches an
+    existing book only when an imported one matches it. In that mode each
+    merge() diff must be written before the next chunk is merged, since
+    books from earlier chunks are looked up through `get_book`.
+    
+    Strategies for an imported book that matches an existing one:
+        'newest'  - field-wise merge; non-empty fields from the newer record
+                    (by date_modified/date_added) win
+        'replace' - the imported record replaces the existing one
+        'keep'    - the existing record is kept as is
+        'add'     - like 'keep', but unmatched books get fresh ids
+    """
+    
+    def __init__(self, existing_books, strategy='replace', get_book=None):
+        if strategy not in MERGE_STRATEGIES:
+            raise ValueError(f"Unknown merge strategy: {strategy}")
+        self.strategy = strategy
+        self.get_book = get_book
+        self.books = None if get_book else {}  # id -> merged book, in order
+        self._chunk = {}  # id -> book merged in the current chunk
+        self._by_id = set()
+        self._by_isbn = {}
+        self._by_title_author = {}
+        for book in existing_books:
+            if self.books is not None:
+                book = dict(book)
+                # Books without an id are still kept (under a private key)
+                book_key = book.get('id') if book.get('id') is not None else f"#{len(self.books)}"
+                self.books[book_key] = book
+                self._index(book, book_key)
+            elif book.get('id') is not None:
+                self._index(book, book['id'])
+    
+    def _index(self, book, book_key):
+        if book.get('id') is not None:
+            self._by_id.add(book['id'])
+        isbn = normalize_isbn(book)
+        if isbn:
+            self._by_isbn.setdefault(isbn, book_key)
+        key = normalize_title_author(book)
+        if key:
+            self._by_title_author.setdefault(key, book_key)
+    
+    def find(self, book):
+        """
+        Return the id (key) of the library book matching `book`, or None.
+        """
+        if self.strategy != 'add' and book.get('id') in self._by_id:
+            return book['id']
+        isbn = normalize_isbn(book)
+        if isbn and isbn in self._by_isbn:
+            return self._by_isbn[isbn]
+        key = normalize_title_author(book)
+        if key and key in self._by_title_author:
+            return self._by_title_author[key]
+        return None
+    
+    def _existing(self, book_key):
+        if book_key in self._chunk:
+            return self._chunk[book_key]
+        if self.books is not None:
+            return self.books[book_key]
+        return self.get_book(book_key)
+    
+    def _resolve(self, existing, imported):
+        if self.strategy in ('keep', 'add'):
+            return existing
+        if self.strategy == 'replace':
+            merged = dict(imported)
+        else:  # newest
+            imported_time = _timestamp(imported)
+            existing_time = _timestamp(existing)
+            # An undated record only fills gaps; it never wins a conflict
+            imported_wins = imported_time is not None and (existing_time is None or imported_time >= existing_time)
+            newer, older = (imported, existing) if imported_wins else (existing, imported)
+            merged = dict(older)
+            merged.update({field: value for field, value in newer.items() if not _is_empty(value)})
+        # The library's id and date added identify the book, whatever matched it
+        merged['id'] = existing.get('id')
+        if not _is_empty(existing.get('date_added')):
+            merged['date_added'] = existing['date_added']
+        return merged
+    
+    def merge(self, imported_books):
+        """
+        Merge imported books into the library.
         
+        Args:
+            imported_books (iterable): Books to merge
+            
+        Returns:
+            dict: Diff with 'inserted', 'updated' and 'unchanged' lists of
+                books; only inserted and updated books need to be written
+        """
+        diff = {'inserted': [], 'updated': [], 'unchanged': []}
+        inserted_at = {}  # book id -> index in diff['inserted']
+        # Books from earlier chunks have been written; get_book finds them
+        self._chunk = {}
         for imported_book in imported_books:
-            # Generate new ID to avoid conflicts
-            imported_book['id'] = str(uuid.uuid4())
-            result.append(imported_book)
+            book_key = self.find(imported_book)
+            existing = self._existing(book_key) if book_key is not None else None
+            if existing is None:
+                if self.strategy == 'add' or not imported_book.get('id'):
+                    # Generate new ID to avoid conflicts
+                    imported_book['id'] = str(uuid.uuid4())
+                # Only books that are actually added get today's date
+                if _is_empty(imported_book.get('date_added')):
+                    imported_book['date_added'] = datetime.now().strftime('%Y-%m-%d')
+                book_key = imported_book['id']
+                inserted_at[book_key] = len(diff['inserted'])
+                self._index(imported_book, book_key)
+                self._store(book_key, imported_book)
+                diff['inserted'].append(imported_book)
+                continue
             
-        return result
-        
+            merged = self._resolve(existing, imported_book)
+            if merged == existing:
+                diff['unchanged'].append(imported_book)
+            else:
+                self._index(merged, book_key)
+                self._store(book_key, merged)
+                if book_key in inserted_at:
+                    # A duplicate within this import folds into its insert
+                    diff['inserted'][inserted_at[book_key]] = merged
+                    diff['unchanged'].append(imported_book)
+                else:
+                    diff['updated'].append(merged)
+        return diff
+    
+    def _store(self, book_key, book):
+        if self.books is not None:
+            self.books[book_key] = book
+        else:
+            self._chunk[book_key] = book
+
 def save_books(books):
     """
     Save multiple books to the database.
@@ -192,29 +567,39 @@ def save_books(books):
     Returns:
         bool: True if successful, False otherwise
     """
-    try:
-        db = get_database()
-        if db is None:  # Explicitly check if database is None
-            print("❌ Database connection failed.")
-            return False
-        
-        books_collection = db.books
-        
-        # Save or update each book
-        for book in books:
-            # Check if the book already exists
-            existing_book = books_collection.find_one({"id": book["id"]})
-            
-            if existing_book:
-                # Update the existing book
-                books_collection.replace_one({"id": book["id"]}, book)
-                print(f"✅ Updated book with ID: {book['id']}")
-            else:
-                # Add a new book
-                books_collection.insert_one(book)
-                print(f"✅ Added new book with ID: {book['id']}")
+    return bulk_save_books(books)['ok']
+
+def bulk_save_books(books, batch_size=DEFAULT_BULK_BATCH_SIZE, ordered=False):
+    """
+    Upsert books in batches, sending only the ones that changed.
+    
+    Args:
+        books (iterable): Books to save
+        batch_size (int): Books per bulk write round trip
+        ordered (bool): Stop at the first failed write if True
         
-        return True
-    except Exception as e:
-        st.error(f"❌ Error saving books: {str(e)}")
-        return False
+    Returns:
+        dict: Report with sent/skipped/upserted/modified counts, errors and
+            per-batch timings (see LibraryStore.bulk_upsert)
+    """
+    return get_store().bulk_upsert(books, batch_size=batch_size, ordered=ordered)
+
+
+if __name__ == '__main__':
+    # Command-line export: python -m helpers.file_operations library.csv.gz
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Stream the library to a CSV, JSON or NDJSON file.")
+    parser.add_argument('path', help="Output file (.csv, .json or .ndjson, optionally .gz)")
+    parser.add_argument('--format', choices=['csv', 'json', 'ndjson'], help="Override the format inferred from the path")
+    parser.add_argument('--basic', action='store_true', help="Only export title, author, year, genre and status")
+    parser.add_argument('--gzip', action='store_true', default=None, help="Compress the output")
+    args = parser.parse_args()
+    
+    size = export_library_to_file(
+        args.path,
+        export_format=args.format,
+        fields='export' if args.basic else 'full',
+        compress=args.gzip
+    )
+    print(f"✅ Exported library to {args.path} ({size} bytes)")
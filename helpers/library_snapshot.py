@@ -0,0 +1,151 @@
+import threading
+import pandas as pd
+from helpers.library_store import get_store
+
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['status', 'genre', 'author']
+NUMERIC_COLUMNS = ['pages', 'rating', 'progress']
+
+# Latest snapshot per library collection: name -> (store version, DataFrame)
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+def build_snapshot(books):
+    """
+    Build a columnar snapshot of a list of books for analytics.
+
+    Args:
+        books (list): List of book dictionaries
+
+    Returns:
+        pandas.DataFrame: One row per book with categorical status, genre
+            and author, numeric pages/rating/progress (0 when missing),
+            nullable integer year and datetime date_added
+    """
+    df = pd.DataFrame.from_records(
+        books,
+        columns=['id', 'title'] + CATEGORICAL_COLUMNS + NUMERIC_COLUMNS + ['year', 'date_added']
+    )
+
+    df['status'] = df['status'].fillna('Unknown').astype(str).astype('category')
+    df['genre'] = df['genre'].fillna('Unknown').astype(str).astype('category')
+    df['author'] = df['author'].fillna('Unknown').astype(str).astype('category')
+
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0)
+    df['year'] = pd.to_numeric(df['year'], errors='coerce').astype('Int64')
+    df['date_added'] = pd.to_datetime(df['date_added'], format='%Y-%m-%d', errors='coerce')
+
+    return df
+
+def get_snapshot(store=None):
+    """
+    Return the analytics snapshot of a library, rebuilt only when the
+    store's version has changed since the last call.
+
+    Args:
+        store (LibraryStore, optional): Library to snapshot (default store if None)
+
+    Returns:
+        pandas.DataFrame: Snapshot built by build_snapshot
+    """
+    store = store or get_store()
+    cached = _snapshots.get(store.collection_name)
+    if cached is not None and cached[0] == store.version:
+        return cached[1]
+
+    with _snapshots_lock:
+        cached = _snapshots.get(store.collection_name)
+        if cached is not None and cached[0] == store.version:
+            return cached[1]
+        books = store.load_books('chart')
+        # Read the version after loading, which may itself bump it
+        version = store.version
+        df = build_snapshot(books)
+        _snapshots[store.collection_name] = (version, df)
+        return df
+
+def as_snapshot(books):
+    """
+    Accept either a snapshot or a list of books and return a snapshot.
+    """
+    if isinstance(books, pd.DataFrame):
+        return books
+    return build_snapshot(books)
+
+def rating_distribution(df):
+    """
+    Count books by whole-star rating (1-5), ignoring unrated books.
+
+    Returns:
+        pandas.Series: rating -> count for ratings 1 to 5
+    """
+    ratings = df.loc[df['rating'] > 0, 'rating']
+    return ratings.value_counts().reindex(range(1, 6), fill_value=0).astype(int)
+
+def reading_metrics(df):
+    """
+    Compute the headline reading metrics of a library.
+
+    Returns:
+        dict: total_books, read_books, total_pages, read_pages,
+            completion_rate, page_completion, avg_pages, rated_books and
+            avg_rating
+    """
+    total_books = len(df)
+    is_read = df['status'] == 'Read'
+    pages = df['pages'].where(df['pages'] > 0, 0)
+    rated = df['rating'] > 0
+
+    read_books = int(is_read.sum())
+    total_pages = int(pages.sum())
+    read_pages = int(pages[is_read].sum())
+    rated_books = int(rated.sum())
+
+    return {
+        'total_books': total_books,
+        'read_books': read_books,
+        'total_pages': total_pages,
+        'read_pages': read_pages,
+        'completion_rate': (read_books / total_books * 100) if total_books > 0 else 0,
+        'page_completion': (read_pages / total_pages * 100) if total_pages > 0 else 0,
+        'avg_pages': (total_pages / total_books) if total_books > 0 else 0,
+        'rated_books': rated_books,
+        'avg_rating': float(df.loc[rated, 'rating'].mean()) if rated_books else 0
+    }
+
+def additions_by_date(df):
+    """
+    Count books by the date they were added.
+
+    Returns:
+        pandas.Series: date string (YYYY-MM-DD) -> count, oldest first
+    """
+    dates = df['date_added'].dropna()
+    counts = dates.dt.strftime('%Y-%m-%d').value_counts().sort_index()
+    return counts
+
+def reading_rate(df):
+    """
+    Books marked Read per month between the first and last such book added.
+
+    Returns:
+        float or None: Books per month, or None if it cannot be computed
+    """
+    read_dates = df.loc[df['status'] == 'Read', 'date_added'].dropna()
+    if read_dates.empty:
+        return None
+    days_diff = (read_dates.max() - read_dates.min()).days
+    if days_diff <= 0:
+        return None
+    return len(read_dates) / (days_diff / 30)
+
+def pages_for_status(df, status):
+    """
+    Sum and count the books with a known page count in a given status.
+
+    Returns:
+        tuple: (total pages, number of books)
+    """
+    pages = df.loc[(df['status'] == status) & (df['pages'] > 0), 'pages']
+    return int(pages.sum()), int(len(pages))
@@ -0,0 +1,1088 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import streamlit as st
+from pymongo import MongoClient
+import certifi  # Import certifi for SSL certificate handling
+from pymongo import ASCENDING, DESCENDING, TEXT, ReplaceOne
+from pymongo.errors import BulkWriteError
+from helpers.aggregations import LibraryFacets, compute_facets
+from helpers.search_index import BookSearchIndex, tokenize
+
+# Pool defaults, overridable through the [MONGODB] secrets section or env vars
+DEFAULT_MAX_POOL_SIZE = 20
+DEFAULT_MAX_IDLE_TIME_MS = 60000
+DEFAULT_HEALTH_CHECK_INTERVAL = 30  # seconds
+
+# Operations per bulk_write call when saving many books
+DEFAULT_BULK_BATCH_SIZE = 500
+# Documents per round trip when streaming from a cursor
+DEFAULT_CURSOR_BATCH_SIZE = 1000
+# Books per page of the library grid
+DEFAULT_PAGE_SIZE = 24
+# Most resolved search matches sent to MongoDB as an id list; broader
+# searches are answered from the cache
+MAX_PUSHDOWN_IDS = 5000
+# Fields drawn on a book card, plus the date used to order listings
+CARD_FIELDS = ['id', 'title', 'author', 'genre', 'year', 'status', 'date_added']
+# Named field sets accepted by the store's reads; None means every field
+PROJECTIONS = {
+    'card': CARD_FIELDS,
+    'chart': ['id', 'title', 'author', 'genre', 'status', 'year', 'pages', 'rating', 'progress', 'date_added'],
+    'export': ['title', 'author', 'year', 'genre', 'status'],
+    'full': None,
+}
+# Order of paged listings, served by the date_added_id index
+PAGE_SORT = [('date_added', DESCENDING), ('id', DESCENDING)]
+
+# Indexes provisioned by LibraryStore.ensure_indexes: (keys, options)
+BOOK_INDEXES = [
+    ([('id', ASCENDING)], {'name': 'id_unique', 'unique': True}),
+    ([('status', ASCENDING), ('genre', ASCENDING)], {'name': 'status_genre'}),
+    ([('date_added', DESCENDING), ('id', DESCENDING)], {'name': 'date_added_id'}),
+    ([('title', TEXT), ('author', TEXT), ('genre', TEXT), ('notes', TEXT)], {
+        'name': 'title_author_genre_notes_text',
+        'weights': {'title': 10, 'author': 5, 'genre': 2, 'notes': 1},
+        'default_language': 'english'
+    }),
+]
+
+# Process-wide client shared by every store
+_client = None
+_client_lock = threading.Lock()
+_client_healthy = False
+_health_thread = None
+
+def get_mongodb_setting(name, default):
+    """
+    Read an optional MongoDB setting from secrets, then the environment.
+    """
+    try:
+        value = st.secrets["MONGODB"].get(name)
+    except Exception:
+        value = None
+    if value is None:
+        value = os.environ.get(name, default)
+    return value
+
+def _health_check_loop(client, interval):
+    """
+    Ping the server in the background so requests never pay for it.
+    """
+    global _client_healthy
+    while _client is client:
+        try:
+            client.admin.command('ping')
+            _client_healthy = True
+        except Exception as e:
+            if _client_healthy:
+                print(f"❌ MongoDB health check failed: {str(e)}")  # Debug statement
+            _client_healthy = False
+        time.sleep(interval)
+
+def get_client():
+    """
+    Return the process-wide MongoClient, creating it on first use.
+
+    The client owns a connection pool, so a single instance is safely shared
+    by all threads (and therefore all Streamlit sessions) in the process.
+    """
+    global _client, _health_thread
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            # Get MongoDB URI from secrets
+            MONGODB_URI = st.secrets["MONGODB"]["MONGODB_URL"]
+
+            # Create client with SSL/TLS configuration and a bounded pool
+            client = MongoClient(
+                MONGODB_URI,
+                tls=True,  # Enable TLS/SSL
+                tlsCAFile=certifi.where(),  # Use certifi's CA bundle
+                retryWrites=True,
+                w="majority",
+                maxPoolSize=int(get_mongodb_setting("MONGODB_MAX_POOL_SIZE", DEFAULT_MAX_POOL_SIZE)),
+                maxIdleTimeMS=int(get_mongodb_setting("MONGODB_MAX_IDLE_TIME_MS", DEFAULT_MAX_IDLE_TIME_MS))
+            )
+            _client = client
+
+            # Health checks run off the request path
+            interval = float(get_mongodb_setting("MONGODB_HEALTH_CHECK_INTERVAL", DEFAULT_HEALTH_CHECK_INTERVAL))
+            _health_thread = threading.Thread(
+                target=_health_check_loop,
+                args=(client, interval),
+                name="mongodb-health-check",
+                daemon=True
+            )
+            _health_thread.start()
+            print("✅ Created pooled MongoDB client")  # Debug statement
+    return _client
+
+def is_database_healthy():
+    """
+    Return the result of the most recent background health check.
+    """
+    return _client_healthy
+
+def close_client():
+    """
+    Close the shared client; the next get_client() call creates a new one.
+    """
+    global _client, _client_healthy
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+            _client_healthy = False
+
+
+class LibraryStore:
+    """
+    Single data-access layer for the library's books.
+
+    Every read and write against the books collection goes through this
+    class, so connection handling and any caching or batching live in one
+    place. helpers.database and helpers.book_data delegate to it.
+
+    Books are cached in memory: the collection is scanned once, writes are
+    applied to the cache in place, and `version` is bumped on every change
+    so callers can tell when their copy is stale.
+    """
+
+    def __init__(self, database_name='library_database', collection_name='books'):
+        self.database_name = database_name
+        self.collection_name = collection_name
+        self.version = 0
+        self._books = {}  # id -> book, in insertion order
+        self._object_ids = {}  # Mongo _id -> book id, for change-stream deletes
+        self._book_object_ids = {}  # book id -> Mongo _id, to forget deleted books
+        self._facets = LibraryFacets()  # maintained with deltas on every write
+        self._facets_copy = (None, None)  # (version, copy handed to readers)
+        self._search_index = BookSearchIndex()  # maintained on every write
+        self._listeners = []  # called with the books of every insert/upsert
+        self._listener_queue = queue.Queue()  # batches of books for the listeners
+        self._listener_thread = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    # Connection
+
+    def get_database(self):
+        """
+        Return the library database from the shared, pooled client.
+        """
+        try:
+            return get_client()[self.database_name]
+        except Exception as e:
+            st.error(f"❌ Database connection error: {str(e)}")
+            return None
+
+    def get_collection(self):
+        """
+        Return the books collection, or None if the database is unavailable.
+        """
+        db = self.get_database()
+        if db is None:
+            return None
+        return db[self.collection_name]
+
+    def init(self):
+        """
+        Initialize the database and collections if they don't exist.
+        """
+        try:
+            db = self.get_database()
+            if db is not None:
+                # Check if the 'books' collection exists
+                if self.collection_name not in db.list_collection_names():
+                    # Create the 'books' collection
+                    db.create_collection(self.collection_name)
+                    print(f"✅ Created '{self.collection_name}' collection.")  # Debug statement
+                else:
+                    print(f"✅ '{self.collection_name}' collection already exists.")  # Debug statement
+                self.ensure_indexes()
+                return True
+            return False
+        except Exception as e:
+            st.error(f"❌ Error initializing database: {str(e)}")
+            return False
+
+    def ensure_indexes(self):
+        """
+        Create the indexes used by id lookups, filters and text search.
+
+        create_index is a no-op for indexes that already exist, so this is
+        safe to run on every start.
+
+        Returns:
+            list: Names of the indexes that could not be created
+        """
+        failed = []
+        books_collection = self.get_collection()
+        if books_collection is None:
+            return [options['name'] for _, options in BOOK_INDEXES]
+        for keys, options in BOOK_INDEXES:
+            try:
+                if any(direction == TEXT for _, direction in keys):
+                    # A collection has one text index; replace an older definition
+                    for name, info in books_collection.index_information().items():
+                        if name != options['name'] and any(direction == TEXT for _, direction in info['key']):
+                            books_collection.drop_index(name)
+                books_collection.create_index(keys, **options)
+            except Exception as e:
+                # e.g. duplicate ids already stored block the unique index
+                print(f"❌ Could not create index {options['name']}: {str(e)}")  # Debug statement
+                failed.append(options['name'])
+        return failed
+
+    def explain_queries(self, sample_query='the'):
+        """
+        Report which index the store's common queries use.
+
+        Args:
+            sample_query (str): Search text used for the search queries
+
+        Returns:
+            list: One dict per query with 'query', 'indexes' (empty for a
+                collection scan), 'keys_examined' and 'docs_examined'
+        """
+        books_collection = self.get_collection()
+        if books_collection is None:
+            return []
+        queries = {
+            'get_book_by_id': {'id': ''},
+            'filter_status_genre': {'status': 'Read', 'genre': 'Fiction'},
+            'search_regex': self._regex_search_filter(sample_query),
+            'search_text': {'$text': {'$search': sample_query}},
+            'find_books': build_book_query(sample_query, 'Fiction', 'Read'),
+        }
+        report = []
+        for name, query in queries.items():
+            try:
+                explain = books_collection.find(query).explain()
+                stats = explain.get('executionStats', {})
+                report.append({
+                    'query': name,
+                    'indexes': sorted(_plan_index_names(explain.get('queryPlanner', {}).get('winningPlan', {}))),
+                    'keys_examined': stats.get('totalKeysExamined'),
+                    'docs_examined': stats.get('totalDocsExamined')
+                })
+            except Exception as e:
+                report.append({'query': name, 'error': str(e)})
+        return report
+
+    # Cache
+
+    def _ensure_loaded(self):
+        """
+        Populate the cache with a single collection scan if needed.
+
+        Returns:
+            bool: True if the cache holds the collection, False otherwise
+        """
+        if self._loaded:
+            return True
+        with self._lock:
+            if self._loaded:
+                return True
+            try:
+                books_collection = self.get_collection()
+                if books_collection is None:
+                    return False
+                self._books = {}
+                self._object_ids = {}
+                self._book_object_ids = {}
+                for book in books_collection.find({}):
+                    self._remember_object_id(book.pop('_id'), book.get('id'))
+                    self._books[book.get('id')] = book
+                self._facets = compute_facets(self._books.values())
+                self._search_index = BookSearchIndex(self._books.values())
+                self._loaded = True
+                self.version += 1
+                print(f"📚 Loaded {len(self._books)} books from the database")  # Debug statement
+                return True
+            except Exception as e:
+                st.error(f"❌ Error loading books: {str(e)}")
+                return False
+
+    def _cache_set(self, cached):
+        # Callers hold the lock; keeps the facets in step with the books
+        previous = self._books.get(cached.get('id'))
+        if previous is not None:
+            self._facets.remove(previous)
+        self._books[cached.get('id')] = cached
+        self._facets.add(cached)
+        self._search_index.add(cached)
+
+    def _remember_object_id(self, object_id, book_id):
+        # Callers hold the lock
+        self._object_ids[object_id] = book_id
+        self._book_object_ids[book_id] = object_id
+
+    def _cache_put(self, book, object_id=None):
+        """
+        Insert or replace a book in the cache.
+        """
+        with self._lock:
+            if self._loaded:
+                cached = dict(book)
+                object_id = cached.pop('_id', object_id)
+                if object_id is not None:
+                    self._remember_object_id(object_id, cached.get('id'))
+                self._cache_set(cached)
+            self.version += 1
+
+    def _cache_put_many(self, books, object_ids=None):
+        """
+        Insert or replace several books in the cache with one version bump.
+        """
+        object_ids = object_ids or {}
+        with self._lock:
+            if self._loaded:
+                for i, book in enumerate(books):
+                    cached = dict(book)
+                    object_id = cached.pop('_id', object_ids.get(i))
+                    if object_id is not None:
+                        self._remember_object_id(object_id, cached.get('id'))
+                    self._cache_set(cached)
+            self.version += 1
+
+    def _cache_update(self, book_id, updated_data):
+        """
+        Apply a partial update to a cached book.
+        """
+        with self._lock:
+            if self._loaded and book_id in self._books:
+                self._cache_set({**self._books[book_id], **updated_data})
+            self.version += 1
+
+    def _cache_remove(self, book_id):
+        """
+        Drop a book from the cache.
+        """
+        with self._lock:
+            if self._loaded:
+                self._object_ids.pop(self._book_object_ids.pop(book_id, None), None)
+                previous = self._books.pop(book_id, None)
+                if previous is not None:
+                    self._facets.remove(previous)
+                    self._search_index.remove(book_id)
+            self.version += 1
+
+    def add_listener(self, callback):
+        """
+        Register `callback(books)` to be called with the books of every
+        successful add_book, insert_books and bulk_upsert batch (e.g. to
+        keep a derived index up to date).
+
+        Callbacks run on a background thread, in write order, so a slow
+        listener never delays the write that triggered it.
+        """
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+            if self._listener_thread is None:
+                self._listener_thread = threading.Thread(
+                    target=self._run_listeners, name="book-listeners", daemon=True
+                )
+                self._listener_thread.start()
+
+    def wait_for_listeners(self):
+        """Block until the listeners have seen every write so far."""
+        if self._listener_thread is not None:
+            self._listener_queue.join()
+
+    def _notify(self, books):
+        if self._listeners:
+            # Copies: callers may keep changing their dicts after the write
+            self._listener_queue.put([dict(book) for book in books])
+
+    def _run_listeners(self):
+        while True:
+            books = self._listener_queue.get()
+            try:
+                for callback in list(self._listeners):
+                    try:
+                        callback(books)
+                    except Exception as e:
+                        print(f"❌ Book listener failed: {str(e)}")  # Debug statement
+            finally:
+                self._listener_queue.task_done()
+
+    def invalidate(self):
+        """
+        Forget the cached books; the next read rescans the collection.
+        """
+        with self._lock:
+            self._books = {}
+            self._object_ids = {}
+            self._book_object_ids = {}
+            self._facets = LibraryFacets()
+            self._search_index = BookSearchIndex()
+            self._loaded = False
+            self.version += 1
+
+    def apply_change(self, change):
+        """
+        Apply a MongoDB change-stream event to the cache.
+
+        Lets another replica's writes reach this process without rescanning
+        the collection. Inserted and updated books are passed to the
+        listeners like local writes. Events for this process's own writes
+        are applied again harmlessly.
+
+        Args:
+            change (dict): Change event with operationType, documentKey and,
+                for inserts/replaces/looked-up updates, fullDocument
+        """
+        operation = change.get('operationType')
+        object_id = change.get('documentKey', {}).get('_id')
+        full_document = change.get('fullDocument')
+
+        if operation in ('insert', 'replace', 'update') and full_document is not None:
+            self._cache_put(full_document, object_id)
+            book = dict(full_document)
+            book.pop('_id', None)
+            self._notify([book])
+        elif operation == 'update':
+            with self._lock:
+                book_id = self._object_ids.get(object_id)
+            if book_id is None:
+                return
+            description = change.get('updateDescription', {})
+            with self._lock:
+                book = self._books.get(book_id)
+                if book is not None:
+                    book = {**book, **description.get('updatedFields', {})}
+                    for field in description.get('removedFields', []):
+                        book.pop(field, None)
+                    self._cache_set(book)
+                self.version += 1
+            if book is not None:
+                self._notify([book])
+        elif operation == 'delete':
+            with self._lock:
+                book_id = self._object_ids.pop(object_id, None)
+            if book_id is not None:
+                self._cache_remove(book_id)
+        elif operation in ('drop', 'rename', 'dropDatabase', 'invalidate'):
+            self.invalidate()
+
+    # Queries
+
+    def get_facets(self):
+        """
+        Return the library's counts and sums without scanning the books.
+
+        Facets are maintained with deltas on every write; readers get a copy
+        that is only refreshed when the version changes.
+
+        Returns:
+            LibraryFacets: Read-only facets for the current library
+        """
+        if not self._ensure_loaded():
+            return LibraryFacets()
+        version, facets = self._facets_copy
+        if version == self.version:
+            return facets
+        with self._lock:
+            facets = self._facets.copy()
+            self._facets_copy = (self.version, facets)
+        return facets
+
+    def rank_books(self, query, genre=None, status=None, limit=20):
+        """
+        Typo-tolerant, relevance-ranked search over the cached library.
+
+        Args:
+            query (str): Search text; misspelt words still match
+            genre (str, optional): Exact genre ('All' or None for any)
+            status (str, optional): Exact status ('All' or None for any)
+            limit (int): Number of best matches to return
+
+        Returns:
+            list: Copies of the best matching books, best first
+        """
+        if not self._ensure_loaded():
+            return []
+        with self._lock:
+            ranked = self._search_index.rank(query, genre, status, limit=limit)
+            return [dict(self._books[book_id]) for book_id, _ in ranked]
+
+    def page_books(self, query='', genre=None, status=None, after=None, page_size=DEFAULT_PAGE_SIZE,
+                   fields='card'):
+        """
+        Fetch one page of books, newest first, using keyset pagination.
+
+        Pages are ordered by (date_added, id), descending, and each page
+        starts after the key of the previous page's last book, so a page
+        costs the same however deep into the library it is. The page is
+        read from MongoDB with build_book_query; the cached library is the
+        fallback when the database is unavailable.
+
+        Args:
+            query (str): Words to find in title, author, genre or notes
+            genre (str, optional): Exact genre ('All' or None for any)
+            status (str, optional): Exact status ('All' or None for any)
+            after (tuple, optional): (date_added, id) key returned with the
+                previous page; None for the first page
+            page_size (int): Books per page
+            fields (str or list): Projection name or fields to return
+
+        Returns:
+            tuple: (list of books, key to pass as `after` for the next page,
+                or None on the last page)
+        """
+        # One extra book tells whether another page follows
+        books = self.find_books(query, genre, status, fields, limit=page_size + 1, after=after)
+        if len(books) > page_size:
+            books = books[:page_size]
+            return books, _page_key(books[-1])
+        return books, None
+
+    def find_books(self, query='', genre=None, status=None, fields='card', limit=0, after=None):
+        """
+        Search and filter books in MongoDB, newest first.
+
+        The selections become a single indexed query (see
+        build_book_query), so only the matching books, and only the
+        requested fields, cross the network. Search words are resolved to
+        book ids through the cached search index when the library is
+        cached (or matched with the text index when it is not). Falls back
+        to the cached library when the database is unavailable or the
+        search matches more than MAX_PUSHDOWN_IDS books.
+
+        Args:
+            query (str): Words to find in title, author, genre or notes
+            genre (str, optional): Exact genre ('All' or None for any)
+            status (str, optional): Exact status ('All' or None for any)
+            fields (str or list): Projection name from PROJECTIONS, or the
+                fields to return ('full' or None for every field)
+            limit (int): Maximum number of books (0 for no limit)
+            after (tuple, optional): Only books sorting after this
+                (date_added, id) key
+
+        Returns:
+            list: Matching books, ordered by (date_added, id) descending
+        """
+        books_collection = self.get_collection()
+        if books_collection is not None:
+            ids = None
+            if tokenize(query) and self._loaded:
+                # Substring matches come from the cached inverted index; the
+                # server then only does indexed id/status/genre/date lookups
+                with self._lock:
+                    ids = list(self._search_index.search(query, genre, status))
+                if len(ids) > MAX_PUSHDOWN_IDS:
+                    return self._find_cached(query, genre, status, fields, limit, after)
+            try:
+                cursor = books_collection.find(
+                    build_book_query(query, genre, status, after, ids),
+                    _projection(fields)
+                ).sort(PAGE_SORT).limit(limit)
+                return list(cursor)
+            except Exception as e:
+                print(f"❌ Error querying books, using the cache: {str(e)}")  # Debug statement
+        return self._find_cached(query, genre, status, fields, limit, after)
+
+    def _find_cached(self, query, genre, status, fields, limit, after):
+        """
+        In-memory counterpart of find_books, over the cached library.
+        """
+        if not self._ensure_loaded():
+            return []
+        with self._lock:
+            books = [self._books[book_id] for book_id in self._search_index.search(query, genre, status)]
+        books.sort(key=_page_key, reverse=True)
+        if after is not None:
+            after = tuple(after)
+            books = [book for book in books if _page_key(book) < after]
+        if limit:
+            books = books[:limit]
+        fields = resolve_projection(fields)
+        return [_project(book, fields) for book in books]
+
+    def get_genres(self):
+        """
+        Return the distinct genre values in the library, sorted.
+        """
+        if not self._ensure_loaded():
+            return []
+        with self._lock:
+            return sorted(str(genre) for genre in self._search_index.genres())
+
+    def load_books(self, projection='full'):
+        """
+        Fetch all books, served from the cache after the first scan.
+
+        Args:
+            projection (str or list): Projection name from PROJECTIONS
+                ('card', 'chart', 'export', 'full') or the fields to return
+
+        Returns:
+            list: Copies of the cached books, holding only the projected fields
+        """
+        fields = resolve_projection(projection)
+        if not self._ensure_loaded():
+            return []
+        with self._lock:
+            return [_project(book, fields) for book in self._books.values()]
+
+    def get_book(self, book_id, projection='full'):
+        """
+        Get a book by its ID from the cache or the database.
+
+        List views only carry a projection of each book; this is the
+        detail fetch for a book that is opened, e.g. for editing.
+
+        Args:
+            book_id: ID of the book
+            projection (str or list): Projection name or fields to return
+        """
+        fields = resolve_projection(projection)
+        if self._loaded:
+            with self._lock:
+                book = self._books.get(book_id)
+            if book is not None:
+                return _project(book, fields)
+        try:
+            books_collection = self.get_collection()
+            if books_collection is None:
+                print("❌ Database connection failed.")
+                return None
+            book = books_collection.find_one({"id": book_id}, _projection(fields))
+            if book is None:
+                print(f"❌ Book with ID {book_id} not found in the database.")
+            return book
+        except Exception as e:
+            st.error(f"❌ Error getting book: {str(e)}")
+            return None
+
+    def iter_books(self, projection=None, batch_size=DEFAULT_CURSOR_BATCH_SIZE):
+        """
+        Iterate books straight from a server-side cursor.
+
+        Unlike load_books this never holds the whole library: documents
+        arrive batch_size at a time as the caller consumes them.
+
+        Args:
+            projection (str or list, optional): Projection name from
+                PROJECTIONS or the fields to fetch (all fields if None)
+            batch_size (int): Documents per cursor round trip
+
+        Yields:
+            dict: Each book
+        """
+        books_collection = self.get_collection()
+        if books_collection is None:
+            return
+        cursor = books_collection.find({}, _projection(projection)).batch_size(batch_size)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    def field_names(self):
+        """
+        List every field used by any book, computed server-side.
+
+        Returns:
+            list: Field names, excluding Mongo's _id
+        """
+        books_collection = self.get_collection()
+        if books_collection is None:
+            return []
+        result = list(books_collection.aggregate([
+            {'$project': {'fields': {'$objectToArray': '$$ROOT'}}},
+            {'$unwind': '$fields'},
+            {'$group': {'_id': None, 'names': {'$addToSet': '$fields.k'}}}
+        ]))
+        if not result:
+            return []
+        return [name for name in result[0]['names'] if name != '_id']
+
+    @staticmethod
+    def _regex_search_filter(query):
+        return {
+            "$or": [
+                {"title": {"$regex": query, "$options": "i"}},
+                {"author": {"$regex": query, "$options": "i"}},
+                {"genre": {"$regex": query, "$options": "i"}}
+            ]
+        }
+
+    def search(self, query, mode='regex', limit=0):
+        """
+        Search for books by title, author or genre.
+
+        Args:
+            query (str): Search text
+            mode (str): 'regex' for case-insensitive substring matching,
+                'text' to use the text index, ordered by relevance, or
+                'fuzzy' for typo-tolerant ranked search of the cached library
+            limit (int): Maximum number of results (0 for no limit; fuzzy
+                search defaults to the best 20)
+
+        Returns:
+            list: Matching books
+        """
+        if mode == 'fuzzy':
+            return self.rank_books(query, limit=limit or 20) if query else []
+        try:
+            books_collection = self.get_collection()
+            if books_collection is not None and query:
+                if mode == 'text':
+                    cursor = books_collection.find(
+                        {'$text': {'$search': query}},
+                        {'_id': 0, 'score': {'$meta': 'textScore'}}
+                    ).sort([('score', {'$meta': 'textScore'})])
+                else:
+                    cursor = books_collection.find(self._regex_search_filter(query), {'_id': 0})
+                books = list(cursor.limit(limit))
+                for book in books:
+                    book.pop('score', None)
+                return books
+            return []
+        except Exception as e:
+            st.error(f"❌ Error searching books: {str(e)}")
+            return []
+
+    # Writes
+
+    def add_book(self, book_data):
+        """
+        Save a new book to the database.
+        """
+        try:
+            books_collection = self.get_collection()
+            if books_collection is not None:
+                # Add unique identifier if not present
+                if 'id' not in book_data:
+                    book_data['id'] = str(datetime.now().timestamp())
+                # Add timestamp
+                book_data['date_added'] = datetime.now().strftime('%Y-%m-%d')
+                # insert_one adds an ObjectId to the dict it is given
+                result = books_collection.insert_one(book_data)
+                book_data.pop('_id', None)
+                if result.inserted_id:
+                    self._cache_put(book_data, result.inserted_id)
+                    self._notify([book_data])
+                    print(f"✅ Book inserted with ID: {result.inserted_id}")  # Debug statement
+                    return True
+            return False
+        except Exception as e:
+            st.error(f"❌ Error saving book: {str(e)}")
+            return False
+
+    def insert_books(self, books):
+        """
+        Insert several new books in a single round trip.
+        """
+        try:
+            books_collection = self.get_collection()
+            if books_collection is None:
+                print("❌ Database connection failed.")
+                return False
+            if not books:
+                print("❌ No books to save.")
+                return False
+            try:
+                result = books_collection.insert_many(books)
+            except BulkWriteError as e:
+                # Some books may have been written; rebuild the cache
+                self.invalidate()
+                self._notify([{k: v for k, v in book.items() if k != '_id'}
+                              for book in books[:e.details.get('nInserted', 0)]])
+                raise
+            for book in books:
+                self._cache_put(book, book.pop('_id', None))
+            self._notify(books)
+            if result.inserted_ids:
+                print(f"✅ Successfully saved {len(result.inserted_ids)} books.")
+                return True
+            print("❌ Failed to save books.")
+            return False
+        except Exception as e:
+            st.error(f"❌ Error saving books: {str(e)}")
+            return False
+
+    def upsert_books(self, books):
+        """
+        Save multiple books, replacing any that already exist (based on ID).
+        """
+        return self.bulk_upsert(books)['ok']
+
+    def bulk_upsert(self, books, batch_size=DEFAULT_BULK_BATCH_SIZE, ordered=False, only_changed=True):
+        """
+        Upsert books with batched ReplaceOne(upsert=True) operations.
+
+        Args:
+            books (iterable): Books to save; each needs an 'id'
+            batch_size (int): Operations per bulk_write round trip
+            ordered (bool): Stop at the first failed operation if True;
+                otherwise the server applies the rest of the batch
+            only_changed (bool): Skip books identical to the cached copy
+
+        Returns:
+            dict: Report with 'ok', 'sent', 'skipped', 'upserted',
+                'modified', 'errors' and per-batch 'batches' timings
+        """
+        report = {
+            'ok': False,
+            'sent': 0,
+            'skipped': 0,
+            'upserted': 0,
+            'modified': 0,
+            'errors': [],
+            'batches': []
+        }
+        books_collection = self.get_collection()
+        if books_collection is None:
+            print("❌ Database connection failed.")
+            return report
+        # The cache is the baseline for change detection
+        if only_changed and not self._ensure_loaded():
+            only_changed = False
+
+        batch = []
+        try:
+            for book in books:
+                book.pop('_id', None)
+                if only_changed:
+                    with self._lock:
+                        if self._books.get(book.get('id')) == book:
+                            report['skipped'] += 1
+                            continue
+                batch.append(book)
+                if len(batch) >= batch_size:
+                    self._write_batch(books_collection, batch, ordered, report)
+                    batch = []
+            if batch:
+                self._write_batch(books_collection, batch, ordered, report)
+            report['ok'] = not report['errors']
+        except BulkWriteError as e:
+            # Some operations may have been applied; rebuild the cache
+            report['errors'].extend(error.get('errmsg') for error in e.details.get('writeErrors', []))
+            self.invalidate()
+            st.error(f"❌ Error saving books: {len(report['errors'])} write errors")
+        except Exception as e:
+            report['errors'].append(str(e))
+            st.error(f"❌ Error saving books: {str(e)}")
+
+        print(f"✅ Bulk upsert sent {report['sent']} books in {len(report['batches'])} batches, "
+              f"skipped {report['skipped']} unchanged.")  # Debug statement
+        return report
+
+    def _write_batch(self, books_collection, batch, ordered, report):
+        """
+        Send one bulk_write batch and record its counts and timing.
+        """
+        start = time.perf_counter()
+        result = books_collection.bulk_write(
+            [ReplaceOne({"id": book["id"]}, book, upsert=True) for book in batch],
+            ordered=ordered
+        )
+        elapsed = time.perf_counter() - start
+        self._cache_put_many(batch, result.upserted_ids)
+        self._notify(batch)
+        report['sent'] += len(batch)
+        report['upserted'] += result.upserted_count
+        report['modified'] += result.modified_count
+        report['batches'].append({
+            'size': len(batch),
+            'seconds': elapsed,
+            'upserted': result.upserted_count,
+            'modified': result.modified_count
+        })
+
+    def update_book(self, book_id, updated_data):
+        """
+        Update an existing book in the database.
+        """
+        try:
+            books_collection = self.get_collection()
+            if books_collection is None:
+                print("❌ Database connection failed.")
+                return False
+            # Never try to overwrite Mongo's own key
+            updated_data = {k: v for k, v in updated_data.items() if k != '_id'}
+            result = books_collection.update_one(
+                {"id": book_id},  # Find the book by its ID
+                {"$set": updated_data}  # Update the fields with new data
+            )
+            if result.modified_count > 0:
+                self._cache_update(book_id, updated_data)
+                print(f"✅ Book updated with ID: {book_id}")  # Debug statement
+                return True
+            print("❌ No changes made to the book.")
+            return False
+        except Exception as e:
+            st.error(f"❌ Error updating book: {str(e)}")
+            return False
+
+    def delete_book(self, book_id):
+        """
+        Delete a book from the database by its ID.
+        """
+        try:
+            books_collection = self.get_collection()
+            if books_collection is not None:
+                result = books_collection.delete_one({"id": book_id})
+                if result.deleted_count > 0:
+                    self._cache_remove(book_id)
+                    print(f"✅ Book deleted with ID: {book_id}")  # Debug statement
+                    return True
+            return False
+        except Exception as e:
+            st.error(f"❌ Error deleting book: {str(e)}")
+            return False
+
+
+def _page_key(book):
+    """
+    Sort key of a book in paged listings: (date_added, id), as strings.
+    """
+    return (str(book.get('date_added') or ''), str(book.get('id') or ''))
+
+
+def resolve_projection(projection):
+    """
+    Turn a projection name from PROJECTIONS, or a list of fields, into a
+    list of fields (None for every field).
+    """
+    if projection is None or isinstance(projection, (list, tuple)):
+        return projection
+    if projection not in PROJECTIONS:
+        raise ValueError(f"Unknown projection: {projection}")
+    return PROJECTIONS[projection]
+
+
+def _project(book, fields):
+    """
+    Copy a cached book, keeping only `fields` (every field if None).
+    """
+    if fields is None:
+        return dict(book)
+    return {field: book[field] for field in fields if field in book}
+
+
+def _projection(fields):
+    """
+    MongoDB projection returning only `fields` (a name or list; all fields
+    if None), never _id.
+    """
+    fields = resolve_projection(fields)
+    projection = {'_id': 0}
+    if fields:
+        projection.update({field: 1 for field in fields})
+    return projection
+
+
+def build_book_query(query='', genre=None, status=None, after=None, ids=None):
+    """
+    Translate search text and genre/status selections into one MongoDB filter.
+
+    Every condition is served by an index: genre/status by status_genre,
+    resolved ids by id_unique, and otherwise each word of the query must
+    be a word of the title, author, genre or notes in the text index.
+
+    Args:
+        query (str): Search text
+        genre (str, optional): Exact genre ('All' or None for any)
+        status (str, optional): Exact status ('All' or None for any)
+        after (tuple, optional): Only match books sorting after this
+            (date_added, id) page key
+        ids (list, optional): Ids of the books matching `query`, already
+            resolved (e.g. by the cached search index); replaces the text
+            search
+
+    Returns:
+        dict: MongoDB filter document
+    """
+    conditions = []
+    if status and status != 'All':
+        conditions.append({'status': status})
+    if genre and genre != 'All':
+        conditions.append({'genre': genre})
+    terms = list(dict.fromkeys(tokenize(query)))
+    if ids is not None:
+        if terms:
+            conditions.append({'id': {'$in': ids}})
+    elif terms:
+        # Quoted terms must all match (unquoted ones would match any)
+        conditions.append({'$text': {'$search': ' '.join(f'"{term}"' for term in terms)}})
+    if after is not None:
+        conditions.append(_after_filter(after))
+    if not conditions:
+        return {}
+    return conditions[0] if len(conditions) == 1 else {'$and': conditions}
+
+
+def _after_filter(after):
+    """
+    Match the books that sort after a page key in descending (date_added, id)
+    order. Books without a date_added sort last.
+    """
+    date_added, book_id = after
+    if not date_added:
+        return {'date_added': {'$in': [None, '']}, 'id': {'$lt': book_id}}
+    return {'$or': [
+        {'date_added': {'$lt': date_added}},
+        {'date_added': None},
+        {'date_added': date_added, 'id': {'$lt': book_id}}
+    ]}
+
+
+def _plan_index_names(plan):
+    """
+    Collect the index names used anywhere in a query plan tree.
+    """
+    names = set()
+    if plan.get('indexName'):
+        names.add(plan['indexName'])
+    for key in ('inputStage', 'queryPlan'):
+        if isinstance(plan.get(key), dict):
+            names |= _plan_index_names(plan[key])
+    for child in plan.get('inputStages', []):
+        names |= _plan_index_names(child)
+    return names
+
+
+# Process-wide stores, one per library collection, so each keeps its own cache
+_stores = {}
+_store_lock = threading.Lock()
+
+def get_store(collection_name='books'):
+    """
+    Return the process-wide LibraryStore for a library collection.
+
+    Args:
+        collection_name (str): Collection holding the library's books
+
+    Returns:
+        LibraryStore: Shared store (and cache) for that library
+    """
+    store = _stores.get(collection_name)
+    if store is None:
+        with _store_lock:
+            store = _stores.get(collection_name)
+            if store is None:
+                store = LibraryStore(collection_name=collection_name)
+                _stores[collection_name] = store
+    return store
+
+def get_library_facets(store=None):
+    """
+    Return a library's facets (status/genre/year/author/rating/page counts).
+
+    Args:
+        store (LibraryStore, optional): Library to read (default store if None)
+
+    Returns:
+        LibraryFacets: Read-only facets, maintained incrementally on write
+    """
+    return (store or get_store()).get_facets()
@@ -0,0 +1,439 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import zlib
+import numpy as np
+from helpers.aggregations import split_genres, compute_facets
+from helpers.search_index import tokenize
+from helpers.open_library import get_response_cache
+from helpers.ann_index import ExactIndex, LSHIndex
+from helpers.library_store import get_store
+
+# Seed catalog shipped with the app; cached Open Library results are added
+SAMPLE_CATALOG_PATH = os.path.join('data', 'sample_books.json')
+# Width of the hashed feature vectors
+DEFAULT_DIMENSIONS = 2 ** 12
+# Weight of each kind of feature before TF-IDF scaling
+FEATURE_WEIGHTS = {'genre': 3.0, 'genre_word': 1.0, 'author': 2.0, 'word': 1.0}
+# Books whose hashed features are memoized for sparse vectorizing
+COLUMN_CACHE_BOOKS = 100000
+# User libraries whose profiles are kept between requests
+USER_CACHE_ENTRIES = 64
+# Seconds before the catalog is re-read to pick up new cached results
+CATALOG_REFRESH_SECONDS = 300
+# Index used for similarity search, overridable with RECOMMENDER_INDEX:
+# 'exact' (brute force), 'lsh' (approximate) or 'auto' (LSH from
+# LSH_MIN_CATALOG books up)
+DEFAULT_INDEX = 'auto'
+LSH_MIN_CATALOG = 50000
+# Narrower vectors for the LSH index keep a million-book memory map small
+LSH_DIMENSIONS = 2 ** 9
+# Where the LSH index is persisted; override with RECOMMENDER_INDEX_PATH
+DEFAULT_INDEX_PATH = os.path.join('data', 'cache', 'recommender_index')
+
+_STOP_WORDS = frozenset(
+    'the and for with that this from into its are was were has have had but not you your '
+    'his her their they them our about over under than then there which who whom what when '
+    'where while how all any can will would one two book books available open library'.split()
+)
+
+
+def book_key(book):
+    """
+    Identity of a book across sources: casefolded title and author words.
+    """
+    return (' '.join(tokenize(book.get('title'))), ' '.join(tokenize(book.get('author'))))
+
+
+def library_ids_fingerprint(user_books):
+    """
+    Stable hash of which books are in a library (their ids, or title and
+    author for books without one), independent of order.
+    """
+    ids = sorted(str(book.get('id') or book_key(book)) for book in user_books)
+    return hashlib.sha256('\n'.join(ids).encode('utf-8')).hexdigest()
+
+
+def book_features(book):
+    """
+    Weighted features of a book: its genres/subjects (whole and by word),
+    authors, and the words of its notes and description.
+
+    Returns:
+        dict: feature -> weight
+    """
+    features = {}
+    def add(feature, weight):
+        features[feature] = features.get(feature, 0.0) + weight
+
+    genres = split_genres(book.get('genre'))
+    genres += [subject for subject in book.get('subjects') or [] if isinstance(subject, str)]
+    for genre in genres:
+        add(f"genre:{genre.strip().casefold()}", FEATURE_WEIGHTS['genre'])
+        for word in tokenize(genre):
+            add(f"genre_word:{word}", FEATURE_WEIGHTS['genre_word'])
+    for author in str(book.get('author') or '').split(', '):
+        if author and author not in ('Unknown', 'Unknown Author'):
+            add(f"author:{' '.join(tokenize(author))}", FEATURE_WEIGHTS['author'])
+    for field in ('notes', 'description'):
+        for word in tokenize(book.get(field)):
+            if len(word) > 2 and word not in _STOP_WORDS and not word.isdigit():
+                add(f"word:{word}", FEATURE_WEIGHTS['word'])
+    return features
+
+
+class HashedTfidf:
+    """
+    TF-IDF over hashed book features.
+
+    Features are hashed into a fixed number of columns, so no vocabulary
+    has to be stored and unseen books can be vectorized directly. Rows are
+    L2-normalized, so a dot product is a cosine similarity.
+    """
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+        self.idf = np.ones(dimensions, dtype=np.float32)
+        self._column_cache = {}
+
+    def _column(self, feature):
+        # crc32 rather than hash(): stable across processes and restarts
+        return zlib.crc32(feature.encode('utf-8')) % self.dimensions
+
+    def _counts(self, books):
+        matrix = np.zeros((len(books), self.dimensions), dtype=np.float32)
+        for row, book in enumerate(books):
+            for feature, weight in book_features(book).items():
+                matrix[row, self._column(feature)] += weight
+        return matrix
+
+    def fit(self, books):
+        """Learn inverse document frequencies from a catalog."""
+        counts = self._counts(books)
+        document_frequency = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + len(books)) / (1 + document_frequency)) + 1).astype(np.float32)
+        return counts
+
+    def _book_columns(self, book):
+        # Hashed feature counts of a book, memoized on the fields
+        # book_features reads, so an unchanged library is not re-tokenized
+        key = tuple(str(book.get(field)) for field in ('genre', 'subjects', 'author', 'notes', 'description'))
+        merged = self._column_cache.get(key)
+        if merged is None:
+            merged = {}
+            for feature, weight in book_features(book).items():
+                column = self._column(feature)
+                merged[column] = merged.get(column, 0.0) + weight
+            if len(self._column_cache) >= COLUMN_CACHE_BOOKS:
+                self._column_cache.clear()
+            self._column_cache[key] = merged
+        return merged
+
+    def transform_sparse(self, books):
+        """
+        Vectorize books as coordinates instead of a dense row per book.
+
+        Returns:
+            tuple: (rows, columns, values) arrays of the books' unit vectors
+        """
+        rows, columns, counts = [], [], []
+        for row, book in enumerate(books):
+            merged = self._book_columns(book)
+            rows.extend([row] * len(merged))
+            columns.extend(merged)
+            counts.extend(merged.values())
+        rows = np.array(rows, dtype=np.int64)
+        columns = np.array(columns, dtype=np.int64)
+        values = np.log1p(np.array(counts, dtype=np.float32)) * self.idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=len(books)))
+        norms[norms == 0] = 1
+        return rows, columns, (values / norms[rows]).astype(np.float32)
+
+    def transform(self, books, counts=None):
+        """
+        Vectorize books.
+
+        Returns:
+            numpy.ndarray: (len(books), dimensions) float32, rows of unit length
+        """
+        if counts is None:
+            counts = self._counts(books)
+        # Sublinear term frequency keeps a repeated word from dominating
+        matrix = np.log1p(counts) * self.idf
+        return normalize_rows(matrix)
+
+
+def normalize_rows(matrix):
+    """Scale each row to unit length (all-zero rows stay zero)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(np.float32)
+
+
+class ContentRecommender:
+    """
+    Content-based recommender over a local catalog.
+
+    Catalog books and the user's books are embedded with HashedTfidf; a
+    user profile (the rating-weighted mean of their books' vectors) is
+    matched against the catalog by cosine similarity through an
+    ExactIndex or LSHIndex. Books can be added after construction; the
+    IDF weights learned from the first catalog are kept (and stored with a
+    persistent index, so a reloaded index embeds new books the same way).
+    """
+
+    def __init__(self, catalog, dimensions=DEFAULT_DIMENSIONS, index=None):
+        self.vectorizer = HashedTfidf(dimensions)
+        self.index = index if index is not None else ExactIndex(dimensions)
+        self._rows = {}  # book_key -> index row
+        self._user_cache = {}  # (type, library fingerprint) -> (library version, state), see _user_state
+        self._lock = threading.Lock()
+        idf = self.index.load_array('idf') if isinstance(self.index, LSHIndex) else None
+        if idf is not None and len(self.index):
+            # Reopened a persisted index: reuse its weights and rows
+            self.vectorizer.idf = idf
+            for row, card in enumerate(self.index.ids):
+                self._rows[book_key(json.loads(card))] = row
+            self.add_books(catalog)
+        else:
+            books = self._new_books(catalog)
+            counts = self.vectorizer.fit(books)
+            if isinstance(self.index, LSHIndex):
+                self.index.save_array('idf', self.vectorizer.idf)
+            self._add(books, self.vectorizer.transform(books, counts))
+
+    def __len__(self):
+        return len(self.index)
+
+    def _new_books(self, books):
+        new = {}
+        for book in books:
+            key = book_key(book)
+            if key[0] and key not in self._rows and key not in new:
+                new[key] = book
+        return list(new.values())
+
+    def _add(self, books, vectors):
+        if not books:
+            return
+        # The index keeps just what a recommendation shows, so a persisted
+        # index can answer without the catalog it was built from
+        cards = [json.dumps({field: book.get(field) for field in ('title', 'author', 'genre')})
+                 for book in books]
+        rows = self.index.add(vectors, cards)
+        self._rows.update(zip(map(book_key, books), rows))
+
+    def add_books(self, books):
+        """
+        Add books not yet in the catalog (by title and author).
+
+        Returns:
+            int: Number of books added
+        """
+        with self._lock:
+            books = self._new_books(books)
+            self._add(books, self.vectorizer.transform(books))
+        return len(books)
+
+    def _user_state(self, user_books, recommendation_type, version):
+        """
+        Profile, sparse book vectors and owned catalog rows for a library,
+        reused while its books, its version and the catalog size are
+        unchanged.
+        """
+        library = (recommendation_type, library_ids_fingerprint(user_books)) if version is not None else None
+        cache_key = (version, len(self.index))
+        cached = self._user_cache.get(library)
+        if version is not None and cached is not None and cached[0] == cache_key:
+            return cached[1]
+
+        top_genres = None
+        if recommendation_type == "genre":
+            # Only the user's favourite genres count
+            top_genres = [genre for genre, _ in compute_facets(user_books).genre.most_common(3)]
+            features = self.vectorizer.transform_sparse([{'genre': ', '.join(top_genres)}])
+            weights = np.ones(1, dtype=np.float32)
+        else:
+            features = self.vectorizer.transform_sparse(user_books)
+            weights = np.array([1 + _rating(book) for book in user_books], dtype=np.float32)
+        # Rating-weighted sum of the books' vectors, accumulated per column
+        rows, columns, values = features
+        profile = np.bincount(columns, weights=values * weights[rows], minlength=self.vectorizer.dimensions)
+        profile = normalize_rows(profile[np.newaxis, :])[0]
+        owned = [self._rows[key] for key in map(book_key, user_books) if key in self._rows]
+        state = (profile, top_genres, features, owned)
+        if version is not None:
+            with self._lock:
+                self._user_cache.pop(library, None)
+                self._user_cache[library] = (cache_key, state)
+                while len(self._user_cache) > USER_CACHE_ENTRIES:
+                    # Dicts keep insertion order: drop the least recently built
+                    del self._user_cache[next(iter(self._user_cache))]
+        return state
+
+    def recommend(self, user_books, recommendation_type="similar", k=5, seed=None, version=None):
+        """
+        Recommend catalog books the user does not own.
+
+        Args:
+            user_books (list): List of user's books
+            recommendation_type (str): 'similar', 'genre' or 'surprise'
+            k (int): Number of recommendations
+            seed (int, optional): Random seed for 'surprise'
+            version (optional): Library version (e.g. LibraryStore.version);
+                when given, the user's profile is reused until it changes
+
+        Returns:
+            list: Recommendations with 'title', 'author', 'genre' and 'reason'
+        """
+        if not user_books or not len(self.index):
+            return []
+        profile, top_genres, features, owned = self._user_state(user_books, recommendation_type, version)
+
+        with self._lock:
+            if recommendation_type == "surprise":
+                # Related enough to be readable, far enough to be new: sample
+                # from the middle of the similarity ranking
+                ranked = self.index.search(profile, min(len(self.index), k * 10), exclude=owned)
+                pool = ranked[len(ranked) // 3:] or ranked
+                picks = random.Random(seed).sample(pool, min(k, len(pool)))
+            else:
+                picks = [(row, score) for row, score in self.index.search(profile, k, exclude=owned) if score > 0]
+            picks = [(json.loads(self.index.ids[row]), np.array(self.index.vectors[row])) for row, _ in picks]
+
+        recommendations = []
+        for book, vector in picks:
+            if recommendation_type == "similar":
+                # Score the user's books against this pick only, sparsely
+                rows, columns, values = features
+                scores = np.bincount(rows, weights=values * vector[columns], minlength=len(user_books))
+                closest = user_books[int(np.argmax(scores))]
+                reason = f"Similar to {closest.get('title', 'a book')} in your library."
+            elif recommendation_type == "genre":
+                reason = f"A good match for your favourite genres: {', '.join(top_genres)}."
+            else:
+                reason = "Something a little different from your usual reads."
+            recommendations.append({
+                'title': book.get('title') or 'Unknown Title',
+                'author': book.get('author') or 'Unknown Author',
+                'genre': book.get('genre') or 'Unknown',
+                'reason': reason
+            })
+        return recommendations
+
+
+def _rating(book):
+    try:
+        return float(book.get('rating') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def load_catalog(path=SAMPLE_CATALOG_PATH):
+    """
+    Assemble the local catalog: the sample books plus every book in cached
+    Open Library search and work responses, one entry per title/author.
+
+    Returns:
+        list: Catalog books
+    """
+    books = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            books.extend(json.load(f))
+    except Exception as e:
+        print(f"❌ Could not read sample catalog: {str(e)}")  # Debug statement
+    cache = get_response_cache()
+    for _, results in cache.values('search:'):
+        books.extend(results or [])
+    for _, details in cache.values('work:'):
+        if details:
+            books.append(details)
+
+    catalog = {}
+    for book in books:
+        key = book_key(book)
+        if key[0] and key not in catalog:
+            catalog[key] = book
+    return list(catalog.values())
+
+
+def create_index(catalog_size, kind=None, path=None):
+    """
+    Pick the similarity index for a catalog of `catalog_size` books.
+
+    Args:
+        catalog_size (int): Books in the catalog
+        kind (str, optional): 'exact', 'lsh' or 'auto' (default from
+            RECOMMENDER_INDEX)
+        path (str, optional): Where to persist an LSH index (default from
+            RECOMMENDER_INDEX_PATH)
+
+    Returns:
+        tuple: (index, dimensions)
+    """
+    kind = kind or os.environ.get('RECOMMENDER_INDEX', DEFAULT_INDEX)
+    path = path or os.environ.get('RECOMMENDER_INDEX_PATH', DEFAULT_INDEX_PATH)
+    if kind == 'auto':
+        kind = 'lsh' if catalog_size >= LSH_MIN_CATALOG or os.path.exists(f"{path}.meta.json") else 'exact'
+    if kind == 'lsh':
+        try:
+            return LSHIndex(LSH_DIMENSIONS, path=path), LSH_DIMENSIONS
+        except Exception as e:
+            # Unreadable or built with other settings: start a fresh index
+            print(f"❌ Could not open recommender index: {str(e)}")  # Debug statement
+            for suffix in ('meta.json', 'vectors', 'codes', 'ids', 'idf.npy'):
+                if os.path.exists(f"{path}.{suffix}"):
+                    os.remove(f"{path}.{suffix}")
+            return LSHIndex(LSH_DIMENSIONS, path=path), LSH_DIMENSIONS
+    return ExactIndex(DEFAULT_DIMENSIONS), DEFAULT_DIMENSIONS
+
+
+_recommender = None
+_recommender_refreshed_at = 0
+_recommender_lock = threading.Lock()
+
+def _on_books_saved(books):
+    # Library store listener: books added to any library join the catalog
+    if _recommender is not None:
+        _recommender.add_books(books)
+
+def get_local_recommender():
+    """
+    Return the process-wide ContentRecommender, adding newly cached
+    catalog books at most every CATALOG_REFRESH_SECONDS. Books saved
+    through the library store are added as they are saved.
+    """
+    global _recommender, _recommender_refreshed_at
+    if _recommender is None or time.time() - _recommender_refreshed_at > CATALOG_REFRESH_SECONDS:
+        with _recommender_lock:
+            if _recommender is None:
+                catalog = load_catalog()
+                index, dimensions = create_index(len(catalog))
+                _recommender = ContentRecommender(catalog, dimensions, index)
+                _recommender_refreshed_at = time.time()
+                get_store().add_listener(_on_books_saved)
+            elif time.time() - _recommender_refreshed_at > CATALOG_REFRESH_SECONDS:
+                _recommender.add_books(load_catalog())
+                _recommender_refreshed_at = time.time()
+    return _recommender
+
+def recommend_locally(user_books, recommendation_type="similar", k=5, version=None):
+    """
+    Offline recommendations from the local catalog.
+
+    Args:
+        version (optional): Library version, to reuse the user's profile
+            while the library is unchanged (see ContentRecommender.recommend)
+
+    Returns:
+        list: Recommendations (empty if the catalog has nothing to offer)
+    """
+    try:
+        return get_local_recommender().recommend(user_books, recommendation_type, k, version=version)
+    except Exception as e:
+        print(f"❌ Local recommendations failed: {str(e)}")  # Debug statement
+        return []
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import ReadTimeoutError
+from helpers.response_cache import ResponseCache
+
+# Endpoints, overridable with OPEN_LIBRARY_URL / OPEN_LIBRARY_COVERS_URL
+# (e.g. to point at a mirror or a local stub server)
+DEFAULT_BASE_URL = "https://openlibrary.org"
+DEFAULT_COVERS_URL = "https://covers.openlibrary.org"
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+# Retries for connection errors and 429/5xx responses, with exponential
+# backoff (0.5s, 1s, 2s, ...) unless the server sends Retry-After
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Keep-alive connections held open to the Open Library host
+DEFAULT_POOL_SIZE = 10
+# Requests per second across all threads (Open Library asks identified
+# clients to stay around this); override with OPEN_LIBRARY_RATE_LIMIT
+DEFAULT_RATE_LIMIT = 3
+# On-disk tier of the response cache (override with OPEN_LIBRARY_CACHE_PATH)
+DEFAULT_CACHE_PATH = os.path.join('data', 'cache', 'open_library.sqlite')
+
+
+class OpenLibraryError(Exception):
+    """Raised when Open Library answers with an error status."""
+
+    def __init__(self, status_code):
+        super().__init__(f"Open Library returned HTTP {status_code}")
+        self.status_code = status_code
+
+
+class RateLimiter:
+    """
+    Token bucket shared by threads: allows `rate` calls per second on
+    average, with bursts of up to `burst` calls.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class OpenLibraryClient:
+    """
+    HTTP client for the Open Library API.
+
+    All requests share one requests.Session, so TCP/TLS connections are
+    pooled and kept alive between calls instead of being set up per
+    request. Every request has connect/read timeouts, and idempotent GETs
+    are retried with backoff on connection errors and 429/5xx responses.
+    Requests from all threads pass through one rate limiter.
+    """
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, covers_url=DEFAULT_COVERS_URL,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, pool_size=DEFAULT_POOL_SIZE,
+                 rate_limit=DEFAULT_RATE_LIMIT):
+        self.base_url = base_url.rstrip('/')
+        self.covers_url = covers_url.rstrip('/')
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=['GET'],
+            respect_retry_after_header=True,
+            # Hand the last response back so callers can report its status
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'PersonalLibraryManager/1.0'
+
+    def get(self, path, params=None):
+        """
+        GET a path under the base URL.
+
+        Returns:
+            requests.Response: The response (possibly an error status)
+
+        Raises:
+            requests.Timeout: When every attempt timed out
+            requests.RequestException: On connection errors that outlast
+                the retries
+        """
+        if self.limiter is not None:
+            self.limiter.acquire()
+        try:
+            return self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        except requests.ConnectionError as e:
+            # Read timeouts that exhaust the retries surface as a
+            # ConnectionError wrapping urllib3's MaxRetryError
+            reason = getattr(e.args[0] if e.args else None, 'reason', None)
+            if isinstance(reason, ReadTimeoutError):
+                raise requests.ReadTimeout(str(reason), request=e.request) from e
+            raise
+
+    def search(self, query, limit=10, fields='title,author_name,first_publish_year,subject,cover_i'):
+        """
+        Query /search.json.
+
+        Returns:
+            requests.Response: The search response
+        """
+        return self.get('/search.json', {'q': query, 'limit': limit, 'fields': fields})
+
+    def work(self, work_id):
+        """
+        Fetch /works/<work_id>.json.
+
+        Returns:
+            requests.Response: The work response
+        """
+        return self.get(f'/works/{work_id}.json')
+
+    def cover_url(self, cover_id, size='M'):
+        """
+        URL of a cover image (size 'S', 'M' or 'L'), or None without an id.
+        """
+        if not cover_id:
+            return None
+        return f"{self.covers_url}/b/id/{cover_id}-{size}.jpg"
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
+
+
+# Process-wide client shared by every page and session
+_client = None
+_client_lock = threading.Lock()
+
+def get_open_library_client():
+    """
+    Return the shared OpenLibraryClient, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenLibraryClient(
+                    base_url=os.environ.get('OPEN_LIBRARY_URL', DEFAULT_BASE_URL),
+                    covers_url=os.environ.get('OPEN_LIBRARY_COVERS_URL', DEFAULT_COVERS_URL),
+                    rate_limit=float(os.environ.get('OPEN_LIBRARY_RATE_LIMIT', DEFAULT_RATE_LIMIT))
+                )
+    return _client
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """
+    Return the process-wide cache of Open Library responses.
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(os.environ.get('OPEN_LIBRARY_CACHE_PATH', DEFAULT_CACHE_PATH))
+    return _response_cache
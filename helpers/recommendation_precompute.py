@@ -0,0 +1,147 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from helpers.book_data import load_books
+from helpers.ai_recommendations import (
+    OPENAI_API_KEY,
+    get_recommendation_cache,
+    recommendation_key,
+    recommendation_ttl,
+    request_recommendations
+)
+
+RECOMMENDATION_TYPES = ['similar', 'genre', 'surprise']
+# Recommendation requests handed to a worker process at a time
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_MAX_WORKERS = 4
+
+
+def iter_libraries():
+    """
+    Yield every library the recommendations page asks about. The page
+    recommends for the shared library in the database, loaded the same
+    way here so the cache keys match the ones it looks up.
+
+    Yields:
+        tuple: (library name, list of books)
+    """
+    books = load_books()
+    if books:
+        yield 'database', books
+
+
+def stale_requests(libraries, types=RECOMMENDATION_TYPES, force=False):
+    """
+    List the (library, type) pairs whose cached recommendations are missing
+    or expired. Libraries with identical inputs share one request.
+
+    Returns:
+        tuple: (requests as (key, name, type, books) tuples, number of
+            pairs that were still fresh)
+    """
+    cache = get_recommendation_cache()
+    pending = {}
+    fresh = 0
+    for name, books in libraries:
+        for recommendation_type in types:
+            key = recommendation_key(books, recommendation_type)
+            if key in pending:
+                continue
+            if not force and cache.get(key, recommendation_ttl(recommendation_type)) is not None:
+                fresh += 1
+                continue
+            pending[key] = (key, name, recommendation_type, books)
+    return list(pending.values()), fresh
+
+
+def _compute_batch(batch):
+    """
+    Worker: request recommendations for a batch of (key, name, type, books).
+
+    Returns:
+        list: (key, name, recommendations or None, error or None) tuples
+    """
+    results = []
+    for key, name, recommendation_type, books in batch:
+        try:
+            results.append((key, name, request_recommendations(books, recommendation_type), None))
+        except Exception as e:
+            results.append((key, name, None, str(e)))
+    return results
+
+
+def precompute_recommendations(types=RECOMMENDATION_TYPES, batch_size=DEFAULT_BATCH_SIZE,
+                               max_workers=DEFAULT_MAX_WORKERS, force=False):
+    """
+    Compute recommendations for every library ahead of time.
+
+    Requests are split into batches and run on a process pool; results are
+    written to the recommendation cache under the library fingerprint they
+    were computed from, which is where the recommendations page looks
+    first. A library whose fingerprint still has a fresh entry is skipped,
+    so running the job again only recomputes what changed or expired.
+
+    Args:
+        types (list): Recommendation types to compute
+        batch_size (int): Requests per worker task
+        max_workers (int): Worker processes
+        force (bool): Recompute even fresh entries
+
+    Returns:
+        dict: Report with 'libraries', 'fresh', 'computed', 'errors'
+            (name/type -> message) and 'seconds'
+    """
+    start = time.perf_counter()
+    report = {'libraries': 0, 'fresh': 0, 'computed': 0, 'errors': {}, 'seconds': 0}
+    if not OPENAI_API_KEY:
+        print("❌ No OpenAI API key configured; nothing to precompute.")  # Debug statement
+        return report
+
+    libraries = list(iter_libraries())
+    report['libraries'] = len(libraries)
+    pending, report['fresh'] = stale_requests(libraries, types, force)
+    print(f"📚 {len(libraries)} libraries: {len(pending)} recommendation lists to compute, "
+          f"{report['fresh']} still fresh")  # Debug statement
+
+    cache = get_recommendation_cache()
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    if batches:
+        # spawn: workers start clean instead of inheriting the parent's
+        # open database connections and HTTP clients
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(batches)), mp_context=context) as executor:
+            futures = [executor.submit(_compute_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                # Only this process writes to the cache file
+                for key, name, recommendations, error in future.result():
+                    if recommendations:
+                        cache.put(key, recommendations)
+                        report['computed'] += 1
+                    else:
+                        report['errors'][f"{name}/{key.split(':', 1)[0]}"] = error or "No recommendations in the reply"
+
+    report['seconds'] = time.perf_counter() - start
+    print(f"✅ Precomputed {report['computed']} recommendation lists in {report['seconds']:.1f}s, "
+          f"{len(report['errors'])} failed")  # Debug statement
+    return report
+
+
+if __name__ == '__main__':
+    # Scheduled run, e.g. nightly: python -m helpers.recommendation_precompute
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute recommendations for every library.")
+    parser.add_argument('--types', nargs='+', choices=RECOMMENDATION_TYPES, default=RECOMMENDATION_TYPES)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Requests per worker task")
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS, help="Worker processes")
+    parser.add_argument('--force', action='store_true', help="Recompute lists that are still fresh")
+    args = parser.parse_args()
+
+    report = precompute_recommendations(
+        types=args.types,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        force=args.force
+    )
+    for name, error in report['errors'].items():
+        print(f"❌ {name}: {error}")
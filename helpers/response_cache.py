@@ -0,0 +1,254 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Entries kept per tier before the least recently used are evicted
+DEFAULT_MEMORY_ENTRIES = 512
+DEFAULT_DISK_ENTRIES = 10000
+
+
+class ResponseCache:
+    """
+    Two-tier TTL + LRU cache for JSON-serializable responses.
+
+    The first tier is an in-process LRU dict; the second an SQLite file
+    that survives restarts and is shared by every process on the machine.
+    Each entry records when it was fetched. Within its TTL an entry is
+    served as is; for a further `stale_ttl` seconds it is still served,
+    but refreshed in a background thread (stale-while-revalidate), so
+    callers only wait on the network for entries they have never fetched
+    or that are long expired. Concurrent misses on one key share a single
+    fetch.
+
+    Attributes:
+        stats (dict): Counters of fresh 'hits' (memory) and 'disk_hits',
+            'stale_hits', 'misses', 'shared' (misses that waited on another
+            caller's fetch), 'refreshes' and 'errors'
+    """
+
+    def __init__(self, path=None, memory_entries=DEFAULT_MEMORY_ENTRIES, disk_entries=DEFAULT_DISK_ENTRIES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.stats = dict.fromkeys(['hits', 'disk_hits', 'stale_hits', 'misses', 'shared', 'refreshes', 'errors'], 0)
+        self._memory = OrderedDict()  # key -> (value, fetched_at), oldest use first
+        self._refreshing = set()  # keys being refreshed in the background
+        self._inflight = {}  # key -> Future of a fetch in progress
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._open_disk(path)
+
+    # Disk tier
+
+    def _open_disk(self, path):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'fetched_at REAL NOT NULL, used_at REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)')
+            self._db.commit()
+        except Exception as e:
+            # The memory tier still works without the file
+            print(f"❌ Response cache disk tier unavailable: {str(e)}")  # Debug statement
+            self._db = None
+
+    def _disk_get(self, key):
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute('SELECT value, fetched_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET used_at = ? WHERE key = ?', (time.time(), key))
+            self._db.commit()
+            return json.loads(row[0]), row[1]
+        except Exception as e:
+            print(f"❌ Response cache read failed: {str(e)}")  # Debug statement
+            return None
+
+    def _disk_put(self, key, value, fetched_at):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (key, value, fetched_at, used_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), fetched_at, fetched_at)
+            )
+            # Evict the least recently used rows beyond the size bound
+            self._db.execute(
+                'DELETE FROM responses WHERE key IN ('
+                'SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)',
+                (self.disk_entries,)
+            )
+            self._db.commit()
+        except Exception as e:
+            print(f"❌ Response cache write failed: {str(e)}")  # Debug statement
+
+    # Lookups
+
+    def _lookup(self, key, ttl):
+        """
+        Find an entry in memory, then on disk. A memory entry older than
+        `ttl` is checked against the disk tier too, since another process
+        (e.g. the precompute job) may have written a newer one.
+
+        Returns:
+            tuple: ((value, fetched_at), tier) with tier 'hits' or
+                'disk_hits', or (None, None) if the key is not cached
+        """
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            if time.time() - entry[1] <= ttl:
+                return entry, 'hits'
+        stored = self._disk_get(key)
+        if stored is not None and (entry is None or stored[1] > entry[1]):
+            self._memory_put(key, stored)
+            return stored, 'disk_hits'
+        if entry is not None:
+            return entry, 'hits'
+        return None, None
+
+    def _memory_put(self, key, entry):
+        # Callers hold the lock
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key, ttl):
+        """
+        Return the value cached for `key` if it is younger than `ttl`
+        seconds, else None.
+        """
+        with self._lock:
+            entry, tier = self._lookup(key, ttl)
+            if entry is None or time.time() - entry[1] > ttl:
+                self.stats['misses'] += 1
+                return None
+            # Counted only once the entry is known to be fresh
+            self.stats[tier] += 1
+        return entry[0]
+
+    def put(self, key, value):
+        """Store a freshly fetched value in both tiers."""
+        entry = (value, time.time())
+        with self._lock:
+            self._memory_put(key, entry)
+            self._disk_put(key, value, entry[1])
+
+    def get_or_fetch(self, key, fetch, ttl, stale_ttl=0):
+        """
+        Return the cached value for `key`, fetching it if needed.
+
+        Args:
+            key (str): Cache key
+            fetch (callable): Called with no arguments to fetch the value;
+                exceptions propagate on a miss and are not cached
+            ttl (float): Seconds an entry is served without refreshing
+            stale_ttl (float): Further seconds an expired entry is still
+                served while it is refreshed in the background
+
+        Returns:
+            The cached or freshly fetched value
+        """
+        now = time.time()
+        with self._lock:
+            entry, tier = self._lookup(key, ttl)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age <= ttl:
+                    self.stats[tier] += 1
+                    return value
+                if age <= ttl + stale_ttl:
+                    self.stats['stale_hits'] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+                    return value
+            pending = self._inflight.get(key)
+            if pending is None:
+                self.stats['misses'] += 1
+                pending = self._inflight[key] = Future()
+                owner = True
+            else:
+                self.stats['shared'] += 1
+                owner = False
+        if not owner:
+            # Another caller is already fetching this key; share its result
+            return pending.result()
+        try:
+            value = fetch()
+            self.put(key, value)
+            pending.set_result(value)
+            return value
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh(self, key, fetch):
+        try:
+            self.put(key, fetch())
+            with self._lock:
+                self.stats['refreshes'] += 1
+        except Exception as e:
+            # Keep serving the stale value until the next attempt
+            with self._lock:
+                self.stats['errors'] += 1
+            print(f"❌ Background refresh of {key} failed: {str(e)}")  # Debug statement
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def values(self, prefix=''):
+        """
+        Return every cached value whose key starts with `prefix`, fresh or
+        not, from both tiers.
+
+        Returns:
+            list: (key, value) pairs
+        """
+        with self._lock:
+            found = {key: entry[0] for key, entry in self._memory.items() if key.startswith(prefix)}
+            if self._db is not None:
+                try:
+                    rows = self._db.execute(
+                        "SELECT key, value FROM responses WHERE substr(key, 1, ?) = ?",
+                        (len(prefix), prefix)
+                    ).fetchall()
+                    for key, value in rows:
+                        if key not in found:
+                            found[key] = json.loads(value)
+                except Exception as e:
+                    print(f"❌ Response cache read failed: {str(e)}")  # Debug statement
+        return list(found.items())
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM responses')
+                self._db.commit()
+
+    def hit_rate(self):
+        """Share of lookups answered from either tier, as a percentage."""
+        served = self.stats['hits'] + self.stats['disk_hits']
+        total = served + self.stats['misses']
+        return (served / total * 100) if total > 0 else 0
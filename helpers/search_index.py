@@ -0,0 +1,377 @@
+import heapq
+import math
+import re
+from collections import defaultdict
+
+# Book fields whose words are searchable, with their weight in ranking
+FIELD_WEIGHTS = {'title': 3.0, 'author': 2.0, 'genre': 1.0, 'notes': 1.0}
+INDEXED_FIELDS = list(FIELD_WEIGHTS)
+# Query terms shorter than this are matched as word prefixes, longer ones
+# as substrings through the trigram index
+NGRAM_SIZE = 3
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word tokens.
+    """
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).casefold())
+
+
+def _trigrams(token):
+    return {token[i:i + NGRAM_SIZE] for i in range(len(token) - NGRAM_SIZE + 1)}
+
+
+def max_edits(term):
+    """
+    Edits tolerated when fuzzy-matching a term: none for very short terms,
+    one up to five letters, two beyond.
+    """
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) <= 5 else 2
+
+
+def edit_distance(a, b, limit):
+    """
+    Levenshtein distance between a and b, or limit + 1 once it exceeds limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _bitset(slots, size):
+    """
+    Build an int bitset with the given slot bits set.
+    """
+    data = bytearray((size + 7) // 8)
+    for slot in slots:
+        data[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(data, 'little')
+
+
+def _bits(bitset):
+    """
+    Return the positions of the set bits of an int bitset, lowest first.
+    """
+    # One pass over the binary string beats peeling bits off a large int
+    return [i for i, bit in enumerate(bin(bitset)[:1:-1]) if bit == '1']
+
+
+class BookSearchIndex:
+    """
+    In-memory inverted index over a library's books.
+
+    Each book gets a slot number. Every token of its title, author, genre
+    and notes has a posting set of the slots containing it, and each status
+    and genre value has a posting bitset (a Python int) for filtering.
+    Query terms are resolved to tokens through a trigram index (substrings)
+    or a prefix table (short terms); postings are combined as sets and then
+    masked with the facet bitsets. Books are added and removed one at a
+    time, so the index follows writes without rebuilding.
+    """
+
+    def __init__(self, books=()):
+        self._slots = {}  # book id -> slot
+        self._ids = []  # slot -> book id (None once removed)
+        self._entries = {}  # slot -> (token weights, status, genre), for removal
+        self._postings = {}  # token -> set of slots
+        self._trigrams = defaultdict(set)  # trigram -> tokens
+        self._prefixes = defaultdict(set)  # 1..NGRAM_SIZE-1 char prefix -> tokens
+        self._status = {}  # status -> bitset
+        self._genre = {}  # genre -> bitset
+        self._all = 0
+        self._lengths = {}  # slot -> weighted document length, for BM25
+        self._total_length = 0.0
+        self._load([
+            (book.get('id'), self._book_tokens(book), book.get('status', 'Unknown'), book.get('genre', 'Unknown'))
+            for book in books
+        ])
+
+    def __len__(self):
+        return len(self._slots)
+
+    # Maintenance
+
+    def add(self, book):
+        """
+        Index a book, replacing any earlier version with the same id.
+
+        A re-indexed book keeps its slot, and so its place in result order.
+        """
+        book_id = book.get('id')
+        slot = self._slots.get(book_id)
+        if slot is not None:
+            self._unindex(slot)
+        else:
+            slot = len(self._ids)
+            self._ids.append(book_id)
+            self._slots[book_id] = slot
+
+        self._index(slot, self._book_tokens(book), book.get('status', 'Unknown'), book.get('genre', 'Unknown'))
+
+    @staticmethod
+    def _book_tokens(book):
+        # token -> field-weighted term frequency
+        tokens = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(book.get(field)):
+                tokens[token] += weight
+        return dict(tokens)
+
+    def _load(self, entries):
+        """
+        Index many (book id, tokens, status, genre) entries at once.
+
+        Facet bitsets are built once per value from slot lists, rather than
+        by growing a large int book by book. Ids must not be indexed yet.
+        """
+        # Later duplicates replace earlier ones in the earlier one's place,
+        # as with add()
+        unique = {}
+        for entry in entries:
+            unique[entry[0]] = entry
+        statuses = defaultdict(list)
+        genres = defaultdict(list)
+        start = len(self._ids)
+        for slot, (book_id, tokens, status, genre) in enumerate(unique.values(), start):
+            self._ids.append(book_id)
+            self._slots[book_id] = slot
+            self._entries[slot] = (tokens, status, genre)
+            self._lengths[slot] = sum(tokens.values())
+            self._total_length += self._lengths[slot]
+            for token in tokens:
+                if token not in self._postings:
+                    self._add_token(token)
+                self._postings[token].add(slot)
+            statuses[status].append(slot)
+            genres[genre].append(slot)
+
+        size = len(self._ids)
+        for facet, values in ((self._status, statuses), (self._genre, genres)):
+            for value, slots in values.items():
+                facet[value] = facet.get(value, 0) | _bitset(slots, size)
+        self._all |= _bitset(range(start, size), size)
+
+    def _add_token(self, token):
+        self._postings[token] = set()
+        for trigram in _trigrams(token):
+            self._trigrams[trigram].add(token)
+        for length in range(1, NGRAM_SIZE):
+            self._prefixes[token[:length]].add(token)
+
+    def _index(self, slot, tokens, status, genre):
+        bit = 1 << slot
+        for token in tokens:
+            if token not in self._postings:
+                self._add_token(token)
+            self._postings[token].add(slot)
+
+        self._status[status] = self._status.get(status, 0) | bit
+        self._genre[genre] = self._genre.get(genre, 0) | bit
+        self._all |= bit
+        self._entries[slot] = (tokens, status, genre)
+        self._lengths[slot] = sum(tokens.values())
+        self._total_length += self._lengths[slot]
+
+    def remove(self, book_id):
+        """
+        Drop a book from the index; unknown ids are ignored.
+        """
+        slot = self._slots.pop(book_id, None)
+        if slot is None:
+            return
+        self._unindex(slot)
+        self._ids[slot] = None
+        # Slots are not reused, so repack once most of them are empty
+        if len(self._ids) > 2 * len(self._slots) + 1024:
+            self._compact()
+
+    def _unindex(self, slot):
+        mask = ~(1 << slot)
+        tokens, status, genre = self._entries.pop(slot)
+        self._total_length -= self._lengths.pop(slot)
+        for token in tokens:
+            self._postings[token].discard(slot)
+            if not self._postings[token]:
+                # Forget words no book uses any more
+                del self._postings[token]
+                for trigram in _trigrams(token):
+                    self._trigrams[trigram].discard(token)
+                for length in range(1, NGRAM_SIZE):
+                    self._prefixes[token[:length]].discard(token)
+        for facet, value in ((self._status, status), (self._genre, genre)):
+            facet[value] &= mask
+            if not facet[value]:
+                del facet[value]
+        self._all &= mask
+
+    def _compact(self):
+        """
+        Renumber the live books into consecutive slots, keeping their order.
+        """
+        entries = [(book_id,) + self._entries[slot] for slot, book_id in enumerate(self._ids) if book_id is not None]
+        self.__init__()
+        self._load(entries)
+
+    # Queries
+
+    def matching_tokens(self, term):
+        """
+        Return the indexed tokens that a query term matches.
+
+        Terms of NGRAM_SIZE characters or more match any token containing
+        them; shorter terms match tokens starting with them.
+        """
+        if len(term) < NGRAM_SIZE:
+            return set(self._prefixes.get(term, ()))
+        candidates = None
+        for trigram in _trigrams(term):
+            tokens = self._trigrams.get(trigram)
+            if not tokens:
+                return set()
+            candidates = set(tokens) if candidates is None else candidates & tokens
+        return {token for token in candidates if term in token}
+
+    def term_slots(self, term):
+        """Slots of the books containing a token matched by `term`."""
+        slots = set()
+        for token in self.matching_tokens(term):
+            slots |= self._postings[token]
+        return slots
+
+    def query_bitset(self, query='', genre=None, status=None):
+        """
+        Bitset of the books matching every query term and the filters.
+
+        Args:
+            query (str): Search text; every word must match
+            genre (str, optional): Exact genre value ('All' or None for any)
+            status (str, optional): Exact status value ('All' or None for any)
+        """
+        bitset = self._all
+        if genre and genre != 'All':
+            bitset &= self._genre.get(genre, 0)
+        if status and status != 'All':
+            bitset &= self._status.get(status, 0)
+        terms = tokenize(query)
+        if not terms or not bitset:
+            return bitset
+
+        # Intersect the rarest terms first to keep the candidate set small
+        term_slots = sorted((self.term_slots(term) for term in terms), key=len)
+        slots = term_slots[0]
+        for other in term_slots[1:]:
+            if not slots:
+                break
+            slots = slots & other
+        return bitset & _bitset(slots, len(self._ids))
+
+    def search(self, query='', genre=None, status=None):
+        """
+        Return the ids of the matching books, in the order they were indexed.
+        """
+        return [self._ids[slot] for slot in _bits(self.query_bitset(query, genre, status))]
+
+    def fuzzy_tokens(self, term):
+        """
+        Return the indexed tokens a term matches, allowing for typos.
+
+        Substring/prefix matches weigh 1.0. Tokens sharing a trigram with
+        the term and within max_edits(term) edits of it weigh less the more
+        edits they need.
+
+        Returns:
+            dict: token -> match weight between 0 and 1
+        """
+        matches = dict.fromkeys(self.matching_tokens(term), 1.0)
+        limit = max_edits(term)
+        if not limit:
+            return matches
+        candidates = set()
+        for trigram in _trigrams(term):
+            candidates |= self._trigrams.get(trigram, set())
+        for token in candidates - matches.keys():
+            distance = edit_distance(term, token, limit)
+            if distance <= limit:
+                matches[token] = 1.0 - distance / (len(term) + 1)
+        return matches
+
+    def rank(self, query, genre=None, status=None, limit=20, fuzzy=True):
+        """
+        Rank books against a query with BM25 over field-weighted terms.
+
+        A book scores for every query term it matches, so partial matches
+        still appear, below books matching more terms. Only the best `limit`
+        books are kept, using a heap rather than a full sort.
+
+        Args:
+            query (str): Search text
+            genre (str, optional): Exact genre filter ('All' or None for any)
+            status (str, optional): Exact status filter ('All' or None for any)
+            limit (int): Number of results to return
+            fuzzy (bool): Tolerate typos in query terms
+
+        Returns:
+            list: (book id, score) pairs, best first
+        """
+        terms = tokenize(query)
+        live = len(self._slots)
+        if not terms or not live:
+            return []
+        allowed = None
+        if (genre and genre != 'All') or (status and status != 'All'):
+            allowed = set(_bits(self.query_bitset('', genre, status)))
+        average_length = self._total_length / live or 1.0
+
+        scores = defaultdict(float)
+        for term in terms:
+            expansions = self.fuzzy_tokens(term) if fuzzy else dict.fromkeys(self.matching_tokens(term), 1.0)
+            # A book counts once per term, through its best-matching token
+            term_scores = {}
+            for token, match_weight in expansions.items():
+                postings = self._postings[token]
+                idf = math.log(1 + (live - len(postings) + 0.5) / (len(postings) + 0.5))
+                for slot in postings:
+                    if allowed is not None and slot not in allowed:
+                        continue
+                    tf = self._entries[slot][0][token]
+                    length = self._lengths[slot]
+                    norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length))
+                    score = match_weight * idf * norm
+                    if score > term_scores.get(slot, 0):
+                        term_scores[slot] = score
+            for slot, score in term_scores.items():
+                scores[slot] += score
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self._ids[slot], score) for slot, score in best]
+
+    def genres(self):
+        """Distinct genre values present in the library."""
+        return list(self._genre.keys())
+
+    def statuses(self):
+        """Distinct status values present in the library."""
+        return list(self._status.keys())
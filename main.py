@@ -15,13 +15,18 @@ import sys
 import importlib
 import traceback
 from datetime import datetime
-from helpers.database import init_db, add_book, get_all_books, delete_book, update_book, get_book_by_id
+from helpers.database import init_db, add_book, get_all_books, delete_book, update_book, get_book_by_id, get_books_page
+from helpers.library_store import get_store, get_library_facets
 
 # Initialize the database
 init_db()
 
+# Keep the book cache in sync with other replicas (MONGODB_CACHE_SYNC)
+from helpers.cache_sync import start_cache_sync
+start_cache_sync()
+
 # Import helper modules
-from helpers.book_data import load_books, save_book, get_book_status_counts
+from helpers.book_data import load_books, save_book
 from helpers.data_visualization import create_reading_status_chart, create_genre_distribution_chart
 from helpers.auth import show_login_page, show_register_page, get_current_user, logout_user, require_login
 
@@ -58,8 +63,11 @@ if not os.path.exists('data'):
     os.makedirs('data')
 
 # Initialize session state
-if 'books' not in st.session_state:
-    st.session_state.books = get_all_books()
+# Books come from the shared in-process cache; only re-copy them when the
+# cache version moves (a write from this or another session)
+if 'books' not in st.session_state or st.session_state.get('books_version') != get_store().version:
+    st.session_state.books = get_all_books('card')
+    st.session_state.books_version = get_store().version
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'home'
 if 'search_query' not in st.session_state:
@@ -70,6 +78,11 @@ if 'filter_status' not in st.session_state:
     st.session_state.filter_status = 'All'
 if 'edit_book_id' not in st.session_state:
     st.session_state.edit_book_id = None
+if 'page_keys' not in st.session_state:
+    # Keyset cursors of the grid pages visited so far (None = first page)
+    st.session_state.page_keys = [None]
+if 'page_size' not in st.session_state:
+    st.session_state.page_size = 24
 
 # Initialize session state for library
 if 'library_data' not in st.session_state:
@@ -108,16 +121,15 @@ with st.sidebar:
     
     st.divider()
     
-    # Library Stats
+    # Library Stats (shared facets, recomputed only when the library changes)
     st.subheader("Library Stats")
-    book_counts = get_book_status_counts(st.session_state.books)
+    facets = get_library_facets()
     
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Total Books", len(st.session_state.books))
+        st.metric("Total Books", facets.total)
     with col2:
-        read_percentage = (book_counts.get('Read', 0) / len(st.session_state.books) * 100) if len(st.session_state.books) > 0 else 0
-        st.metric("Read", f"{read_percentage:.1f}%")
+        st.metric("Read", f"{facets.read_percentage:.1f}%")
 
 # Main content
 if st.session_state.current_page == 'home':
@@ -129,12 +141,11 @@ if st.session_state.current_page == 'home':
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Books", len(st.session_state.books))
+        st.metric("Total Books", facets.total)
     with col2:
-        book_counts = get_book_status_counts(st.session_state.books)
-        st.metric("Read", book_counts.get('Read', 0))
+        st.metric("Read", facets.status.get('Read', 0))
     with col3:
-        st.metric("Wishlist", book_counts.get('Wishlist', 0))
+        st.metric("Wishlist", facets.status.get('Wishlist', 0))
     
     # Dashboard Charts
     st.subheader("Library Analytics")
@@ -143,14 +154,14 @@ if st.session_state.current_page == 'home':
     
     with col1:
         if len(st.session_state.books) > 0:
-            reading_status_fig = create_reading_status_chart(st.session_state.books)
+            reading_status_fig = create_reading_status_chart(facets)
             st.plotly_chart(reading_status_fig, use_container_width=True)
         else:
             st.info("Add books to see reading status statistics.")
     
     with col2:
         if len(st.session_state.books) > 0:
-            genre_fig = create_genre_distribution_chart(st.session_state.books)
+            genre_fig = create_genre_distribution_chart(facets)
             st.plotly_chart(genre_fig, use_container_width=True)
         else:
             st.info("Add books to see genre distribution.")
@@ -166,7 +177,7 @@ if st.session_state.current_page == 'home':
     
     with col2:
         if len(st.session_state.books) > 0:
-            genres = ['All'] + list(set([book.get('genre', 'Unknown') for book in st.session_state.books]))
+            genres = ['All'] + get_store().get_genres()
             genre_filter = st.selectbox("Filter by Genre", genres, index=genres.index(st.session_state.filter_genre) if st.session_state.filter_genre in genres else 0)
             st.session_state.filter_genre = genre_filter
         else:
@@ -177,24 +188,25 @@ if st.session_state.current_page == 'home':
         status_filter = st.selectbox("Filter by Status", statuses, index=statuses.index(st.session_state.filter_status) if st.session_state.filter_status in statuses else 0)
         st.session_state.filter_status = status_filter
     
-    # Filter books based on search and filters
-    filtered_books = st.session_state.books
-    
-    if st.session_state.search_query:
-        filtered_books = [book for book in filtered_books if 
-                         st.session_state.search_query.lower() in book.get('title', '').lower() or 
-                         st.session_state.search_query.lower() in book.get('author', '').lower()]
+    # Start from the first page whenever the search or filters change
+    grid_filters = (st.session_state.search_query, st.session_state.filter_genre, st.session_state.filter_status, st.session_state.page_size)
+    if st.session_state.get('grid_filters') != grid_filters:
+        st.session_state.grid_filters = grid_filters
+        st.session_state.page_keys = [None]
     
-    if st.session_state.filter_genre != 'All':
-        filtered_books = [book for book in filtered_books if book.get('genre', 'Unknown') == st.session_state.filter_genre]
-    
-    if st.session_state.filter_status != 'All':
-        filtered_books = [book for book in filtered_books if book.get('status', 'Unknown') == st.session_state.filter_status]
+    # Only fetch and draw the current page of matching books
+    page_books, next_key = get_books_page(
+        st.session_state.search_query,
+        st.session_state.filter_genre,
+        st.session_state.filter_status,
+        after=st.session_state.page_keys[-1],
+        page_size=st.session_state.page_size
+    )
     
     # Display books in grid
-    if filtered_books:
+    if page_books:
         book_cols = st.columns(3)
-        for i, book in enumerate(filtered_books):
+        for i, book in enumerate(page_books):
             with book_cols[i % 3]:
                 with st.container(border=True):
                     st.subheader(book.get('title', 'Untitled'))
@@ -205,24 +217,43 @@ if st.session_state.current_page == 'home':
                     
                     col1, col2 = st.columns(2)
                     with col1:
-                        if st.button(f"Edit 📝", key=f"edit_{i}", use_container_width=True):
+                        if st.button(f"Edit 📝", key=f"edit_{book.get('id')}", use_container_width=True):
                             st.session_state.edit_book_id = book.get('id')
                             st.session_state.current_page = 'edit_book'
                             st.rerun()
                     with col2:
-                        if st.button(f"Delete 🗑️", key=f"delete_{i}", use_container_width=True):
+                        if st.button(f"Delete 🗑️", key=f"delete_{book.get('id')}", use_container_width=True):
                             delete_book(book.get('id'))
-                            st.session_state.books = get_all_books()
                             st.rerun()
+        
+        # Page navigation
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Previous", disabled=len(st.session_state.page_keys) == 1, use_container_width=True):
+                st.session_state.page_keys.pop()
+                st.rerun()
+        with col2:
+            page_sizes = [12, 24, 48, 96]
+            st.selectbox(
+                f"Page {len(st.session_state.page_keys)} · books per page",
+                page_sizes,
+                key='page_size'
+            )
+        with col3:
+            if st.button("Next ➡️", disabled=next_key is None, use_container_width=True):
+                st.session_state.page_keys.append(next_key)
+                st.rerun()
+    elif len(st.session_state.page_keys) > 1:
+        # The page emptied (e.g. its last book was deleted); step back
+        st.session_state.page_keys.pop()
+        st.rerun()
     else:
         st.info("No books match your search criteria. Add some books or change your filters.")
 
 elif st.session_state.current_page == 'add_book':
     show_add_book_page()
-    st.session_state.books = get_all_books()
 elif st.session_state.current_page == 'edit_book':
     show_edit_book_page()
-    st.session_state.books = get_all_books()
 elif st.session_state.current_page == 'search':
     show_search_page()
 elif st.session_state.current_page == 'analytics':
@@ -1,6 +1,6 @@
 import streamlit as st
 from datetime import datetime  # Import datetime module
-from helpers.database import add_book, get_all_books
+from helpers.database import add_book
 from helpers.book_api import search_books
 
 def show_add_book_page():
@@ -54,7 +54,6 @@ def show_manual_entry_form():
             
             if add_book(book_data):
                 st.success(f"Added '{title}' to your library!")
-                st.session_state.books = get_all_books()  # Refresh the book list
                 st.rerun()  # Refresh the page
             else:
                 st.error("Failed to add book to library")
@@ -92,7 +91,6 @@ def show_search_form():
                         if st.button("📚 Add to Library", key=f"add_{book['title']}"):
                             if add_book(book_data):
                                 st.success(f"Added '{book['title']}' to your library!")
-                                st.session_state.books = get_all_books()  # Refresh the book list
                                 st.rerun()  # Refresh the page
                             else:
                                 st.error("Failed to add book to library")
@@ -4,7 +4,7 @@ import os
 
 # Add the parent directory to the path so we can import helpers
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from helpers.book_data import get_book_by_id, update_book, load_books
+from helpers.book_data import get_book_by_id, update_book
 
 def show_edit_book_page():
     """Display the edit book page"""
@@ -85,7 +85,6 @@ def show_edit_book_page():
                 # Update book using update_book function
                 if update_book(book_id, updated_book):
                     st.success(f"Updated '{title}' in your library!")
-                    st.session_state.books = load_books()  # Refresh the book list
                     st.session_state.current_page = 'home'  # Return to home page
                     st.rerun()
                 else:
@@ -2,16 +2,13 @@ import streamlit as st
 import pandas as pd
 import sys
 import os
+import tempfile
 
 # Add the parent directory to the path so we can import helpers
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from helpers.file_operations import (
-    export_to_csv, 
-    export_to_json, 
-    import_from_csv, 
-    import_from_json,
-    merge_books,
-    save_books
+    export_library_to_file,
+    import_books_stream
 )
 from helpers.book_data import load_books
 
@@ -38,51 +35,41 @@ def show_export_section():
         return
     
     # Export format selection
-    export_format = st.radio("Select export format", ["CSV", "JSON"], horizontal=True)
+    export_format = st.radio("Select export format", ["CSV", "JSON", "NDJSON"], horizontal=True)
     
     # Export options
     include_all = st.checkbox("Include all metadata", value=True, 
                             help="Include all book details like notes, date added, etc.")
+    compress = st.checkbox("Compress (gzip)", value=False,
+                           help="Smaller download for large libraries")
     
     if not include_all:
         st.info("Basic export will only include title, author, year, genre, and status.")
     
-    # Filter books based on options
-    if not include_all:
-        filtered_books = []
-        for book in books:
-            filtered_book = {
-                'title': book.get('title', ''),
-                'author': book.get('author', ''),
-                'year': book.get('year', ''),
-                'genre': book.get('genre', ''),
-                'status': book.get('status', '')
-            }
-            filtered_books.append(filtered_book)
-        export_books = filtered_books
-    else:
-        export_books = books
-    
     # Export button
     if st.button("Export Library", use_container_width=True):
-        if export_format == "CSV":
-            csv_bytes = export_to_csv(export_books)
-            if csv_bytes:
-                st.download_button(
-                    label="Download CSV",
-                    data=csv_bytes,
-                    file_name="my_library.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
-        else:  # JSON
-            json_bytes = export_to_json(export_books)
-            if json_bytes:
+        extension = export_format.lower()
+        mime = {"CSV": "text/csv", "JSON": "application/json", "NDJSON": "application/x-ndjson"}[export_format]
+        
+        file_name = f"my_library.{extension}" + (".gz" if compress else "")
+        
+        # Encoded straight from a database cursor into a temporary file, one
+        # batch at a time; Streamlit then reads the finished file once to
+        # serve the download
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, file_name)
+            export_library_to_file(
+                path,
+                extension,
+                fields='full' if include_all else 'export',
+                compress=compress
+            )
+            with open(path, 'rb') as f:
                 st.download_button(
-                    label="Download JSON",
-                    data=json_bytes,
-                    file_name="my_library.json",
-                    mime="application/json",
+                    label=f"Download {export_format}",
+                    data=f,
+                    file_name=file_name,
+                    mime="application/gzip" if compress else mime,
                     use_container_width=True
                 )
 
@@ -111,67 +98,77 @@ def show_import_section():
           }
         ]
         ```
+        
+        Newline-delimited JSON (`.ndjson`, one book object per line) is also supported.
         """)
     
     # File upload
-    uploaded_file = st.file_uploader("Choose a file", type=["csv", "json"])
+    uploaded_file = st.file_uploader("Choose a file", type=["csv", "json", "ndjson"])
     
     if uploaded_file is not None:
         # Import strategy
         import_strategy = st.radio(
             "Import Strategy", 
-            ["Add to existing library", "Replace existing books with same ID", "Keep existing books (ignore duplicates)"],
-            index=0
+            ["Add to existing library", "Merge with matching books (newest wins)",
+             "Replace matching books", "Keep existing books (ignore duplicates)"],
+            index=0,
+            help="Books match on ID, ISBN, or title and author."
         )
         
         strategy_map = {
             "Add to existing library": "add",
-            "Replace existing books with same ID": "replace",
+            "Merge with matching books (newest wins)": "newest",
+            "Replace matching books": "replace",
             "Keep existing books (ignore duplicates)": "keep"
         }
         
         # Map the selected strategy to the function parameter
         strategy = strategy_map[import_strategy]
         
+        enrich = st.checkbox(
+            "Fill in missing details from Open Library",
+            value=False,
+            help="Looks up books with no year, genre, description or cover by ISBN or title and author."
+        )
+        
         # Import button
         if st.button("Import Books", use_container_width=True):
             # Process the file based on its type
             file_type = uploaded_file.name.split('.')[-1].lower()
+            progress_bar = st.progress(0.0, text="Importing...")
             
-            if file_type == 'csv':
-                success, message, imported_books = import_from_csv(uploaded_file)
-            elif file_type == 'json':
-                success, message, imported_books = import_from_json(uploaded_file)
-            else:
-                success = False
-                message = "Unsupported file type. Please upload a CSV or JSON file."
-                imported_books = []
+            def show_progress(records_read, bytes_read, total_bytes):
+                fraction = min(bytes_read / total_bytes, 1.0) if bytes_read and total_bytes else 0.0
+                progress_bar.progress(fraction, text=f"Imported {records_read} records...")
+            
+            # Books are validated and written chunk by chunk as the file is read
+            success, message, report = import_books_stream(
+                uploaded_file, file_type, strategy, progress_callback=show_progress, enrich=enrich
+            )
+            progress_bar.empty()
             
             if success:
-                # Merge imported books with existing library
-                existing_books = load_books()
-                merged_books = merge_books(existing_books, imported_books, strategy)
+                # Update session state
+                st.session_state.books = load_books('card')
+                
+                # Show success message
+                st.success(f"{message} - Added to your library!")
+                st.caption(
+                    f"{report['inserted']} new, {report['updated']} updated, "
+                    f"{report['unchanged']} unchanged or duplicates"
+                    + (f", {report['enriched']} enriched from Open Library" if enrich else "")
+                )
+                
+                # Display preview of imported books
+                st.subheader("Imported Books Preview")
+                
+                # Create a DataFrame for display
+                df = pd.DataFrame(report['preview'])
+                st.dataframe(df)
                 
-                # Save merged books
-                if save_books(merged_books):
-                    # Update session state
-                    st.session_state.books = merged_books
-                    
-                    # Show success message
-                    st.success(f"{message} - Added to your library!")
-                    
-                    # Display preview of imported books
-                    st.subheader("Imported Books Preview")
-                    
-                    # Create a DataFrame for display
-                    df = pd.DataFrame(imported_books)
-                    st.dataframe(df)
-                    
-                    # Option to return home
-                    if st.button("Return to Home"):
-                        st.session_state.current_page = 'home'
-                        st.rerun()
-                else:
-                    st.error("Failed to save imported books to the database.")
+                # Option to return home
+                if st.button("Return to Home"):
+                    st.session_state.current_page = 'home'
+                    st.rerun()
             else:
                 st.error(message)
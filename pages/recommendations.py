@@ -1,7 +1,9 @@
 import streamlit as st
-from helpers.ai_recommendations import get_book_recommendations
+from helpers.ai_recommendations import start_recommendation_job, cached_recommendation_job
+from helpers.local_recommender import recommend_locally
 from helpers.book_api import search_books
 from helpers.book_data import load_books, update_book_status
+from helpers.library_store import get_store, get_library_facets
 
 def show_recommendations_page():
     """Display the recommendations page with real-time updates"""
@@ -30,34 +32,18 @@ def show_recommendations_page():
     
     # Get recommendations button
     if st.button("Get Recommendations", use_container_width=True):
-        with st.spinner("Generating recommendations..."):
-            recommendations = get_book_recommendations(books, rec_type_param)
-        
-        if recommendations:
-            st.subheader("Recommended Books")
-            
-            # Display recommendations in cards
-            for i, book in enumerate(recommendations):
-                with st.container(border=True):
-                    st.subheader(book.get('title', 'Unknown Title'))
-                    st.write(f"**Author:** {book.get('author', 'Unknown Author')}")
-                    
-                    if 'genre' in book:
-                        st.write(f"**Genre:** {book.get('genre', 'Unknown')}")
-                    
-                    if 'reason' in book:
-                        with st.expander("Why we recommend this"):
-                            st.write(book.get('reason', ''))
-                    
-                    # Add button to find on Open Library
-                    if st.button(f"Okay! Thank You", key=f"find_{i}"):
-                        # Set search as the book title and author
-                        search_query = f"{book.get('title', '')} {book.get('author', '')}"
-                        st.session_state.rec_search_query = search_query
-                        st.session_state.show_rec_search = True
-                        st.rerun()
-        else:
-            st.error("Failed to generate recommendations. Please try again.")
+        # Runs in the background; the rest of the page renders meanwhile
+        st.session_state.rec_job = start_recommendation_job(books, rec_type_param)
+    
+    job = st.session_state.get('rec_job')
+    if job is None or (job.done and job.recommendation_type != rec_type_param):
+        # Show the precomputed answer for this type, if it is still fresh
+        precomputed = cached_recommendation_job(books, rec_type_param)
+        if precomputed is not None:
+            st.session_state.rec_job = job = precomputed
+    if job is not None:
+        # Poll the job every second until it is done, without rerunning the page
+        st.fragment(run_every=None if job.done else 1)(show_recommendation_results)(job)
     
     # Show Open Library search results if requested
     if "show_rec_search" in st.session_state and st.session_state.show_rec_search:
@@ -108,13 +94,7 @@ def show_recommendations_page():
         st.write("**Genres to Explore**")
         
         # Find genres with few books
-        genre_counts = {}
-        for book in books:
-            genre = book.get('genre', 'Unknown')
-            if genre and genre != 'Unknown':
-                # Split genres if they contain commas
-                for g in genre.split(', '):
-                    genre_counts[g] = genre_counts.get(g, 0) + 1
+        genre_counts = get_library_facets().genre
         
         # Sort by count
         sorted_genres = sorted(genre_counts.items(), key=lambda x: x[1])
@@ -149,3 +129,55 @@ def show_recommendations_page():
                         st.error("Failed to update book status")
         else:
             st.write("Add books to your 'To Read' list first!")
+    
+    # Offline picks from the local catalog; the profile is reused until the
+    # library changes, so this stays cheap on every page view
+    local_picks = recommend_locally(books, "similar", k=3, version=get_store().version)
+    if local_picks:
+        st.write("**You Might Also Like**")
+        for pick in local_picks:
+            st.write(f"- **{pick['title']}** by {pick['author']} - {pick['reason']}")
+
+def show_recommendation_results(job):
+    """Display the recommendations a job has produced so far"""
+    if job.done and st.session_state.get('rec_job_polling', False):
+        # Finished since the last poll: one full rerun stops the polling
+        st.session_state.rec_job_polling = False
+        st.rerun()
+    st.session_state.rec_job_polling = not job.done
+    
+    recommendations = job.recommendations
+    if recommendations:
+        st.subheader("Recommended Books")
+        if job.from_cache:
+            st.caption("⚡ Served from cache - your library hasn't changed since these were generated.")
+        elif job.fallback:
+            st.caption("AI recommendations are unavailable right now; these come from your local catalog.")
+        elif job.error:
+            st.caption("The reply was cut short; showing the recommendations that arrived.")
+        
+        # Display recommendations in cards
+        for i, book in enumerate(recommendations):
+            with st.container(border=True):
+                st.subheader(book.get('title', 'Unknown Title'))
+                st.write(f"**Author:** {book.get('author', 'Unknown Author')}")
+                
+                if 'genre' in book:
+                    st.write(f"**Genre:** {book.get('genre', 'Unknown')}")
+                
+                if 'reason' in book:
+                    with st.expander("Why we recommend this"):
+                        st.write(book.get('reason', ''))
+                
+                # Add button to find on Open Library
+                if st.button(f"Okay! Thank You", key=f"find_{i}"):
+                    # Set search as the book title and author
+                    search_query = f"{book.get('title', '')} {book.get('author', '')}"
+                    st.session_state.rec_search_query = search_query
+                    st.session_state.show_rec_search = True
+                    st.rerun()
+    
+    if not job.done:
+        st.info(f"⏳ Generating recommendations... ({len(recommendations)} so far)")
+    elif not recommendations:
+        st.error("Failed to generate recommendations. Please try again.")
@@ -3,53 +3,12 @@ import uuid
 from datetime import datetime
 import sys
 import os
-import requests
 
 # Add the parent directory to the path so we can import helpers
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from helpers.book_api import search_books
 from helpers.database import add_book, get_all_books
-
-def search_books(query, max_results=10):
-    """Search books using Open Library API"""
-    try:
-        # Parameters for Open Library API
-        params = {
-            'q': query,
-            'limit': max_results,
-            'fields': 'title,author_name,first_publish_year,subject,cover_i'
-        }
-        
-        # Make the request
-        response = requests.get("https://openlibrary.org/search.json", params=params)
-        
-        if response.status_code != 200:
-            return []
-        
-        data = response.json()
-        
-        if 'docs' not in data or not data['docs']:
-            return []
-        
-        books = []
-        for doc in data['docs']:
-            book = {
-                'title': doc.get('title', 'Unknown Title'),
-                'author': ', '.join(doc.get('author_name', ['Unknown Author'])),
-                'year': str(doc.get('first_publish_year', 'Unknown')),
-                'genre': ', '.join(doc.get('subject', ['Unknown'])[:3]),
-                'description': 'Available on Open Library',
-                'cover_image': f"https://covers.openlibrary.org/b/id/{doc.get('cover_i')}-M.jpg" if doc.get('cover_i') else None,
-                'status': 'To Read',
-                'rating': 0
-            }
-            books.append(book)
-        
-        return books
-        
-    except Exception as e:
-        st.error(f"Error searching books: {str(e)}")
-        return []
+from helpers.library_store import get_store, CARD_FIELDS
 
 def show_search_page():
     """Display the search page"""
@@ -72,32 +31,29 @@ def show_library_search():
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            search_query = st.text_input("Search by Title or Author", st.session_state.get('search_query', ''))
+            search_query = st.text_input("Search by Title, Author, Genre or Notes", st.session_state.get('search_query', ''))
         
         with col2:
-            genres = ['All'] + list(set([book.get('genre', 'Unknown') for book in st.session_state.books]))
+            genres = ['All'] + get_store().get_genres()
             genre_filter = st.selectbox("Filter by Genre", genres)
         
         with col3:
             statuses = ['All', 'Read', 'Reading', 'To Read', 'Wishlist']
             status_filter = st.selectbox("Filter by Status", statuses)
         
+        typo_tolerant = st.checkbox("Typo-tolerant search (best 20 matches, ranked)")
         search_submitted = st.form_submit_button("🔍 Search")
     
     if search_submitted:
-        # Apply search and filters
-        filtered_books = st.session_state.books
-        
-        if search_query:
-            filtered_books = [book for book in filtered_books if 
-                            search_query.lower() in book.get('title', '').lower() or 
-                            search_query.lower() in book.get('author', '').lower()]
-        
-        if genre_filter != 'All':
-            filtered_books = [book for book in filtered_books if book.get('genre', 'Unknown') == genre_filter]
-        
-        if status_filter != 'All':
-            filtered_books = [book for book in filtered_books if book.get('status', 'Unknown') == status_filter]
+        if typo_tolerant and search_query:
+            # Ranked, typo-tolerant matches from the library's search index
+            filtered_books = get_store().rank_books(search_query, genre_filter, status_filter, limit=20)
+        else:
+            # Only the matching books' card fields are fetched from the database
+            filtered_books = get_store().find_books(
+                search_query, genre_filter, status_filter,
+                fields=CARD_FIELDS + ['cover_image']
+            )
         
         # Display results
         if filtered_books:
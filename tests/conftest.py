@@ -0,0 +1,44 @@
+import pytest
+from fakes import StubOpenLibrary, FakeCompletions
+
+
+@pytest.fixture
+def open_library_stub():
+    """A running StubOpenLibrary, stopped after the test."""
+    stub = StubOpenLibrary().start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def open_library_client(open_library_stub):
+    """An OpenLibraryClient against the stub, with short timeouts and no backoff."""
+    from helpers.open_library import OpenLibraryClient
+
+    client = OpenLibraryClient(base_url=open_library_stub.url, timeout=(1, 0.5), backoff=0, rate_limit=None)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def fake_completions():
+    """A running FakeCompletions endpoint, stopped after the test."""
+    fake = FakeCompletions().start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def ai_recommendations(fake_completions, tmp_path, monkeypatch):
+    """
+    helpers.ai_recommendations talking to the fake endpoint, with an API key
+    and a recommendation cache of its own.
+    """
+    from openai import OpenAI
+    from helpers import ai_recommendations as ai
+    from helpers.response_cache import ResponseCache
+
+    monkeypatch.setattr(ai, 'OPENAI_API_KEY', 'fake-key')
+    monkeypatch.setattr(ai, 'openai', OpenAI(api_key='fake-key', base_url=fake_completions.url))
+    monkeypatch.setattr(ai, '_recommendation_cache', ResponseCache(str(tmp_path / 'recommendations.sqlite')))
+    return ai
@@ -0,0 +1,229 @@
+import json
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Canned search result served by the stub
+STUB_DOCS = [
+    {'key': '/works/OL1W', 'title': 'Dune', 'author_name': ['Frank Herbert'],
+     'first_publish_year': 1965, 'subject': ['Science Fiction'], 'cover_i': 1},
+    {'key': '/works/OL2W', 'title': 'Emma', 'author_name': ['Jane Austen'],
+     'first_publish_year': 1815, 'subject': ['Romance'], 'cover_i': 2},
+]
+
+_WORK_PATH_RE = re.compile(r'^/works/(OL\d+W)\.json$')
+
+
+class StubOpenLibrary:
+    """
+    Local stand-in for the Open Library API, for exercising the client
+    without the network (point OPEN_LIBRARY_URL at `url`).
+
+    Serves /search.json and /works/<id>.json over HTTP/1.1 keep-alive.
+    Failures are scripted with fail(): queued responses are served, in
+    order, before the normal ones.
+
+    Attributes:
+        requests (list): Paths requested, in order
+        connections (int): TCP connections accepted
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.requests = []
+        self.connections = 0
+        self._scripted = deque()  # (status, delay, headers) for the next requests
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread; returns self."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def fail(self, status, times=1, delay=0, headers=None):
+        """
+        Script the next `times` responses: `status` (e.g. 429 or 503) after
+        `delay` seconds. A 200 status with a delay simulates a slow server.
+        """
+        with self._lock:
+            self._scripted.extend([(status, delay, headers or {})] * times)
+
+    def reset(self):
+        """Forget scripted responses and recorded requests."""
+        with self._lock:
+            self._scripted.clear()
+            self.requests = []
+            self.connections = 0
+
+    def _handle(self, handler):
+        path = urlparse(handler.path).path
+        with self._lock:
+            self.requests.append(path)
+            status, delay, headers = self._scripted.popleft() if self._scripted else (200, 0, {})
+        if delay:
+            time.sleep(delay)
+        if status != 200:
+            body = {'error': f"stub status {status}"}
+        elif path == '/search.json':
+            limit = int(parse_qs(urlparse(handler.path).query).get('limit', ['10'])[0])
+            body = {'numFound': len(STUB_DOCS), 'docs': STUB_DOCS[:limit]}
+        elif _WORK_PATH_RE.match(path):
+            work_id = _WORK_PATH_RE.match(path).group(1)
+            body = {'key': f'/works/{work_id}', 'title': f'Work {work_id}', 'description': 'A stub work.'}
+        else:
+            status, body = 404, {'error': 'not found'}
+        payload = json.dumps(body).encode('utf-8')
+        try:
+            handler.send_response(status)
+            handler.send_header('Content-Type', 'application/json')
+            handler.send_header('Content-Length', str(len(payload)))
+            for name, value in headers.items():
+                handler.send_header(name, value)
+            handler.end_headers()
+            handler.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (timed out) before the reply
+            pass
+
+
+# Reply served when none is scripted: five recommendations in the shape
+# the recommendation prompt asks for
+DEFAULT_REPLY = json.dumps({'recommendations': [
+    {'title': f'Fake Book {i}', 'author': f'Author {i}', 'genre': 'Fiction',
+     'reason': f'Recommendation number {i}.'}
+    for i in range(1, 6)
+]})
+# Characters of the reply sent per streamed chunk
+CHUNK_CHARS = 40
+
+
+class FakeCompletions:
+    """
+    Local stand-in for the OpenAI chat completions endpoint, for running
+    the recommendation code without the network or an API key (point
+    OPENAI_BASE_URL at `url`).
+
+    Answers POST /v1/chat/completions, streamed as server-sent events when
+    the request asks for it. Replies are scripted with reply(); each is
+    served once, in order, before falling back to DEFAULT_REPLY.
+
+    Attributes:
+        requests (list): Request bodies received, in order
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.requests = []
+        self._scripted = deque()  # (content, finish_reason, chunk_delay)
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                fake._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serve in a background thread; returns self."""
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply(self, content=DEFAULT_REPLY, finish_reason='stop', chunk_delay=0):
+        """
+        Script the next reply. A finish_reason of 'length' with a cut-off
+        content simulates a reply that hit max_tokens; chunk_delay spaces
+        out streamed chunks.
+        """
+        with self._lock:
+            self._scripted.append((content, finish_reason, chunk_delay))
+
+    def _handle(self, handler):
+        if handler.path.rstrip('/') != '/v1/chat/completions':
+            handler.send_error(404)
+            return
+        body = json.loads(handler.rfile.read(int(handler.headers.get('Content-Length', 0))) or b'{}')
+        with self._lock:
+            self.requests.append(body)
+            content, finish_reason, chunk_delay = (
+                self._scripted.popleft() if self._scripted else (DEFAULT_REPLY, 'stop', 0)
+            )
+        completion = {'id': f'fake-{len(self.requests)}', 'created': int(time.time()),
+                      'model': body.get('model', 'fake')}
+
+        if not body.get('stream'):
+            payload = json.dumps({**completion, 'object': 'chat.completion', 'choices': [{
+                'index': 0, 'finish_reason': finish_reason,
+                'message': {'role': 'assistant', 'content': content}
+            }]}).encode('utf-8')
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'application/json')
+            handler.send_header('Content-Length', str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+            return
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.end_headers()
+        def send(delta, reason=None):
+            chunk = {**completion, 'object': 'chat.completion.chunk', 'choices': [{
+                'index': 0, 'delta': delta, 'finish_reason': reason
+            }]}
+            handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            handler.wfile.flush()
+        try:
+            send({'role': 'assistant', 'content': ''})
+            for start in range(0, len(content), CHUNK_CHARS):
+                if chunk_delay:
+                    time.sleep(chunk_delay)
+                send({'content': content[start:start + CHUNK_CHARS]})
+            send({}, finish_reason)
+            handler.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
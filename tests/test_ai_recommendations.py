@@ -0,0 +1,45 @@
+import time
+from fakes import DEFAULT_REPLY
+
+
+def library(name):
+    return [{'title': f'{name} {i}', 'author': 'Test Author', 'genre': 'Fiction'} for i in range(3)]
+
+
+def wait(job):
+    """Poll a job until it is done; returns the result counts seen on the way."""
+    seen = set()
+    while not job.done:
+        seen.add(len(job.recommendations))
+        time.sleep(0.01)
+    return seen
+
+
+def test_results_stream_in_and_are_cached(ai_recommendations, fake_completions):
+    fake_completions.reply(chunk_delay=0.05)
+    job = ai_recommendations.start_recommendation_job(library('streamed'), 'similar')
+    seen = wait(job)
+
+    assert len(job.recommendations) == 5
+    assert any(0 < count < 5 for count in seen)
+    assert ai_recommendations.get_recommendation_cache().get(job._key, 60) is not None
+
+
+def test_cut_off_reply_is_shown_but_not_cached(ai_recommendations, fake_completions):
+    fake_completions.reply(DEFAULT_REPLY[:len(DEFAULT_REPLY) // 2], finish_reason='length')
+    job = ai_recommendations.start_recommendation_job(library('truncated'), 'similar')
+    wait(job)
+
+    assert 0 < len(job.recommendations) < 5
+    assert job.error
+    assert ai_recommendations.get_recommendation_cache().get(job._key, 60) is None
+
+
+def test_identical_jobs_share_one_request(ai_recommendations, fake_completions):
+    fake_completions.reply(chunk_delay=0.05)
+    jobs = [ai_recommendations.start_recommendation_job(library('shared'), 'genre') for _ in range(3)]
+    for job in jobs:
+        wait(job)
+
+    assert len(fake_completions.requests) == 1
+    assert all(len(job.recommendations) == 5 for job in jobs)
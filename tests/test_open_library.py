@@ -0,0 +1,39 @@
+import time
+import pytest
+import requests
+from helpers.open_library import DEFAULT_RETRIES
+
+
+def test_connections_are_reused(open_library_stub, open_library_client):
+    for _ in range(5):
+        open_library_client.search('dune')
+    assert open_library_stub.connections == 1
+
+
+def test_retries_429(open_library_stub, open_library_client):
+    open_library_stub.fail(429, headers={'Retry-After': '0'})
+    response = open_library_client.search('dune')
+    assert response.status_code == 200
+    assert len(open_library_stub.requests) == 2
+
+
+def test_retries_5xx(open_library_stub, open_library_client):
+    open_library_stub.fail(503, times=2)
+    response = open_library_client.work('OL1W')
+    assert response.status_code == 200
+    assert len(open_library_stub.requests) == 3
+
+
+def test_retries_are_bounded(open_library_stub, open_library_client):
+    open_library_stub.fail(500, times=DEFAULT_RETRIES + 5)
+    response = open_library_client.search('dune')
+    assert response.status_code == 500
+    assert len(open_library_stub.requests) == DEFAULT_RETRIES + 1
+
+
+def test_slow_responses_time_out(open_library_stub, open_library_client):
+    open_library_stub.fail(200, times=DEFAULT_RETRIES + 1, delay=1.5)
+    start = time.perf_counter()
+    with pytest.raises(requests.Timeout):
+        open_library_client.search('dune')
+    assert time.perf_counter() - start < 1.5 * (DEFAULT_RETRIES + 1)